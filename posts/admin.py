@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Comment, Follow, Group, Post
+from .models import Comment, Follow, Group, Like, Post, Tag
 
 
 class PostAdmin(admin.ModelAdmin):
@@ -10,6 +10,7 @@ class PostAdmin(admin.ModelAdmin):
         "pub_date",
         "author",
         "group",
+        "views",
     )
     # добавляем интерфейс для поиска по тексту постов
     search_fields = ("text",)
@@ -55,7 +56,29 @@ class CommentAdmin(admin.ModelAdmin):
     empty_value_display = "-пусто-"
 
 
+class LikeAdmin(admin.ModelAdmin):
+    list_display = (
+        "pk",
+        "user",
+        "post",
+        "created",
+    )
+    list_filter = ("created",)
+    empty_value_display = "-пусто-"
+
+
+class TagAdmin(admin.ModelAdmin):
+    list_display = (
+        "pk",
+        "name",
+    )
+    search_fields = ("name",)
+    empty_value_display = "-пусто-"
+
+
 admin.site.register(Comment, CommentAdmin)
 admin.site.register(Follow, FollowAdmin)
 admin.site.register(Group, GroupAdmin)
+admin.site.register(Like, LikeAdmin)
 admin.site.register(Post, PostAdmin)
+admin.site.register(Tag, TagAdmin)
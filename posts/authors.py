@@ -0,0 +1,69 @@
+"""Сводка автора для профиля: имя и счётчики записей, подписчиков
+и подписок.
+
+Сводка строится одним запросом с подзапросами-счётчиками и кешируется
+через stampede на AUTHOR_SUMMARY_TIMEOUT секунд. Поколение сводки —
+поколение автора, которое увеличивают сохранение пользователя, его
+записи и подписки (см. posts.signals).
+Отсутствие пользователя тоже кешируется: None.
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+
+from yatube import generations, stampede
+from .models import Follow, Post
+
+
+User = get_user_model()
+
+FIELDS = (
+    'id', 'username', 'first_name', 'last_name',
+    'post_count', 'follower_count', 'following_count',
+)
+
+
+def generation(username):
+    return f'author:{username}'
+
+
+def count_of(queryset, field):
+    """Подзапрос с числом строк `queryset`, где `field` — автор."""
+    return Subquery(
+        queryset.filter(**{field: OuterRef('pk')}).order_by()
+        .values(field).annotate(total=Count('pk')).values('total'),
+        output_field=IntegerField(),
+    )
+
+
+def compute(username):
+    row = User.objects.filter(username=username).annotate(
+        post_count=count_of(Post.objects, 'author'),
+        follower_count=count_of(Follow.objects, 'author'),
+        following_count=count_of(Follow.objects, 'user'),
+    ).values_list(*FIELDS).first()
+    if row is None:
+        return None
+    summary = dict(zip(FIELDS, row))
+    for name in ('post_count', 'follower_count', 'following_count'):
+        # Подзапрос без строк даёт NULL.
+        summary[name] = summary[name] or 0
+    return summary
+
+
+def summary(username):
+    """Словарь с FIELDS или None, если пользователя нет."""
+    return stampede.get_or_set(
+        f'author_summary:{username}',
+        lambda: compute(username),
+        settings.AUTHOR_SUMMARY_TIMEOUT,
+        generations.get(generation(username)),
+    )
+
+
+def as_user(summary):
+    """Несохранённый User из сводки: для шаблонов и ссылок, без запроса."""
+    return User(**{
+        name: summary[name]
+        for name in ('id', 'username', 'first_name', 'last_name')
+    })
@@ -0,0 +1,65 @@
+"""Страница записи как закешированная модель чтения.
+
+В кеше (через stampede, на POST_DETAIL_TIMEOUT секунд) лежат запись
+с автором, сообществом и числом комментариев и первая страница
+комментариев с авторами. Сводку автора даёт posts.authors, число лайков
+и отметка читателя добавляются при каждом запросе.
+
+Поколение записи увеличивают её правка и комментарии, подписки
+меняют только сводку автора (см. posts.signals), а сброс просмотров
+в БД (posts.viewcounts) — поколения записей, просмотры которых
+записаны.
+"""
+from django.conf import settings
+from django.db.models import Count
+
+from yatube import generations, stampede
+from .models import Comment, Post
+
+
+def generation(post_id):
+    return f'post:{post_id}'
+
+
+def comments(post_id):
+    return Comment.objects.filter(post_id=post_id).select_related(
+        'author',
+    ).only('id', 'text', 'created', 'post_id', 'author__username').order_by(
+        # Новые сначала, как в Comment.Meta; id — для одинакового created.
+        '-created', '-id',
+    )
+
+
+def prefill(queryset, objects):
+    """Заполняет `queryset` готовыми объектами вместо запроса, как
+    это делает prefetch_related.
+    """
+    queryset._result_cache = objects
+    queryset._prefetch_done = True
+
+
+def compute(post_id):
+    post = Post.objects.filter(pk=post_id).select_related(
+        'author', 'group',
+    ).annotate(
+        comment_count=Count('comments'),
+    ).defer('text', 'preview', 'preview_truncated').first()
+    if post is None:
+        return None
+    return {
+        'post': post,
+        'comments': list(comments(post_id)[:settings.POST_COMMENTS_PAGE]),
+    }
+
+
+def detail(post_id):
+    """{'post': Post, 'comments': [Comment]} или None."""
+    return stampede.get_or_set(
+        f'post_detail:{post_id}',
+        lambda: compute(post_id),
+        settings.POST_DETAIL_TIMEOUT,
+        # id берётся из адреса: поколение записи не создаётся, пока
+        # его не увеличит сигнал. 'authors' меняется при переименовании
+        # пользователя, имена выводятся в записи и комментариях.
+        generations.peek('authors', 'groups', generation(post_id)),
+    )
@@ -0,0 +1,62 @@
+"""Сообщества из памяти процесса.
+
+Сообществ мало, и меняются они редко, поэтому процесс держит их все
+по id и по slug и перечитывает одним запросом, когда меняется
+поколение 'groups' (его увеличивает changed() из сигнала group_changed).
+Загрузка выполняется при прогреве (yatube.warmup) или при первом
+обращении.
+
+Экземпляры Group общие для всех запросов процесса, менять их нельзя.
+"""
+from django.db import transaction
+
+from yatube import generations
+from .models import Group
+
+
+GENERATION = 'groups'
+
+# (поколение, {id: Group}, {slug: Group})
+_state = (None, {}, {})
+
+
+def state():
+    global _state
+    current = generations.get(GENERATION)[0]
+    if _state[0] != current:
+        groups = list(Group.objects.all())
+        _state = (
+            current,
+            {group.id: group for group in groups},
+            {group.slug: group for group in groups},
+        )
+    return _state
+
+
+def changed():
+    """Поколение увеличивается сразу и ещё раз после коммита:
+    процесс, перечитавший сообщества до коммита, иначе держал бы
+    старые название и slug.
+    """
+    generations.bump(GENERATION)
+    transaction.on_commit(lambda: generations.bump(GENERATION))
+
+
+def by_id():
+    """{id: Group} на пачку поисков, например на страницу карточек."""
+    return state()[1]
+
+
+def get_by_slug(slug):
+    """Group или None без запроса: после коммита нового сообщества
+    changed() увеличивает поколение, так что промах — неизвестный slug.
+    """
+    return state()[2].get(slug)
+
+
+def get_by_id(groups, group_id):
+    """Group из `groups` (результат by_id()) или из БД при промахе."""
+    group = groups.get(group_id)
+    if group is None:
+        group = Group.objects.filter(pk=group_id).first()
+    return group
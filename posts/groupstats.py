@@ -0,0 +1,103 @@
+"""Статистика сообществ для каталога `/groups/`.
+
+GroupStats хранит число записей, число авторов и время последней
+записи и меняется по сигналам записи (создание, удаление, перенос
+в другое сообщество) UPDATE'ами с F(). Число авторов ведётся через
+GroupAuthorCount: автор появляется в сообществе, когда его счётчик
+становится ненулевым, и уходит, когда строка счётчика удаляется.
+
+Неточности (гонка при первой записи автора, время последней записи
+после удаления, изменения в обход сигналов) исправляет
+`manage.py reconcile_group_stats`, запускаемая по cron.
+"""
+from django.db import models, transaction
+from django.db.models import Case, Count, F, Max, Q, Value, When
+
+from .models import Group, GroupAuthorCount, GroupStats, Post
+
+
+def group_created(group_id):
+    GroupStats.objects.bulk_create(
+        [GroupStats(group_id=group_id)], ignore_conflicts=True,
+    )
+
+
+def post_added(group_id, author_id, pub_date):
+    authors = GroupAuthorCount.objects.filter(
+        group_id=group_id, author_id=author_id,
+    )
+    new_author = not authors.filter(count__gt=0).update(
+        count=F('count') + 1,
+    )
+    if new_author:
+        GroupAuthorCount.objects.bulk_create([GroupAuthorCount(
+            group_id=group_id, author_id=author_id, count=1,
+        )], ignore_conflicts=True)
+    updated = GroupStats.objects.filter(group_id=group_id).update(
+        post_count=F('post_count') + 1,
+        author_count=F('author_count') + int(new_author),
+        last_activity=Case(
+            When(Q(last_activity__gte=pub_date), then=F('last_activity')),
+            default=Value(pub_date),
+            output_field=models.DateTimeField(),
+        ),
+    )
+    if not updated:
+        # Сообщество создано в обход сигналов (например, loaddata).
+        reconcile([group_id])
+
+
+def post_removed(group_id, author_id):
+    authors = GroupAuthorCount.objects.filter(
+        group_id=group_id, author_id=author_id,
+    )
+    author_left = not authors.filter(count__gt=1).update(
+        count=F('count') - 1,
+    )
+    if author_left:
+        authors.delete()
+    GroupStats.objects.filter(group_id=group_id).update(
+        post_count=F('post_count') - 1,
+        author_count=F('author_count') - int(author_left),
+    )
+
+
+def reconcile(group_ids=None):
+    """Пересчитывает статистику `group_ids` (всех сообществ, если
+    не заданы) по записям, возвращает число сообществ.
+    """
+    groups = Group.objects.all()
+    posts = Post.objects.filter(group__isnull=False).order_by()
+    if group_ids is not None:
+        groups = groups.filter(id__in=group_ids)
+        posts = posts.filter(group_id__in=group_ids)
+    stats = [
+        GroupStats(
+            group_id=group_id, post_count=post_count,
+            author_count=author_count, last_activity=last_activity,
+        )
+        for group_id, post_count, author_count, last_activity in
+        groups.annotate(
+            post_count=Count('posts'),
+            author_count=Count('posts__author', distinct=True),
+            last_activity=Max('posts__pub_date'),
+        ).values_list('id', 'post_count', 'author_count', 'last_activity')
+    ]
+    author_counts = [
+        GroupAuthorCount(group_id=group_id, author_id=author_id, count=count)
+        for group_id, author_id, count in
+        posts.values('group_id', 'author_id').annotate(
+            count=Count('id'),
+        ).values_list('group_id', 'author_id', 'count')
+    ]
+    with transaction.atomic():
+        stale_stats = GroupStats.objects.all()
+        stale_counts = GroupAuthorCount.objects.all()
+        if group_ids is not None:
+            stale_stats = stale_stats.filter(group_id__in=group_ids)
+            stale_counts = stale_counts.filter(group_id__in=group_ids)
+        stale_stats.delete()
+        stale_counts.delete()
+        GroupStats.objects.bulk_create(stats, batch_size=500)
+        GroupAuthorCount.objects.bulk_create(author_counts, batch_size=500)
+    return len(stats)
@@ -0,0 +1,107 @@
+"""Лайки записей.
+
+Число лайков хранится в LIKE_COUNTER_SHARDS строках LikeCounterShard
+на запись: каждый лайк увеличивает случайную из них, так что
+одновременные лайки популярной записи не спорят за одну строку.
+При чтении части суммируются, сумма кешируется на LIKE_COUNT_TIMEOUT
+секунд и сбрасывается при лайке в этом процессе; в ленты других
+процессов и в закешированные страницы новое число попадает по
+истечении их кеша.
+"""
+import random
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Sum
+
+from yatube import generations
+from .models import Like, LikeCounterShard
+
+
+def count_key(post_id):
+    return f'like_count:{post_id}'
+
+
+def user_generation(user_id):
+    """Поколение лайков пользователя: входит в ключ его ленты."""
+    return f'likes:user:{user_id}'
+
+
+def change_count(post_id, delta):
+    shard = random.randrange(settings.LIKE_COUNTER_SHARDS)
+    shards = LikeCounterShard.objects.filter(post_id=post_id, shard=shard)
+    if not shards.update(count=F('count') + delta):
+        LikeCounterShard.objects.bulk_create([LikeCounterShard(
+            post_id=post_id, shard=shard, count=0,
+        )], ignore_conflicts=True)
+        shards.update(count=F('count') + delta)
+    # Сразу и ещё раз после коммита: другой процесс мог закешировать
+    # старую сумму, пока транзакция не завершилась.
+    key = count_key(post_id)
+    cache.delete(key)
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+def like(user, post):
+    """Ставит лайк, возвращает False, если он уже был."""
+    with transaction.atomic():
+        _, created = Like.objects.get_or_create(user=user, post=post)
+        if created:
+            change_count(post.id, 1)
+    if created:
+        generations.bump(user_generation(user.id))
+    return created
+
+
+def unlike(user, post):
+    """Снимает лайк, возвращает False, если его не было."""
+    with transaction.atomic():
+        deleted, _ = Like.objects.filter(user=user, post=post).delete()
+        if deleted:
+            change_count(post.id, -1)
+    if deleted:
+        generations.bump(user_generation(user.id))
+    return bool(deleted)
+
+
+def counts(post_ids):
+    """{id записи: число лайков}: из кеша, остальное одним запросом."""
+    keys = {count_key(post_id): post_id for post_id in post_ids}
+    found = {
+        keys[key]: value for key, value in cache.get_many(keys).items()
+    }
+    missing = [post_id for post_id in post_ids if post_id not in found]
+    if missing:
+        summed = dict.fromkeys(missing, 0)
+        summed.update(
+            LikeCounterShard.objects.filter(post_id__in=missing)
+            .values('post_id').annotate(total=Sum('count'))
+            .values_list('post_id', 'total')
+        )
+        cache.set_many(
+            {count_key(post_id): total for post_id, total in summed.items()},
+            settings.LIKE_COUNT_TIMEOUT,
+        )
+        found.update(summed)
+    return found
+
+
+def liked_ids(user, post_ids):
+    """id записей из `post_ids`, которые лайкнул `user`, одним запросом."""
+    if not user.is_authenticated or not post_ids:
+        return set()
+    return set(Like.objects.filter(
+        user=user, post_id__in=post_ids,
+    ).values_list('post_id', flat=True))
+
+
+def attach(posts, user):
+    """Проставляет записям `like_count` и `liked` для `user`."""
+    post_ids = [post.id for post in posts]
+    like_counts = counts(post_ids)
+    liked = liked_ids(user, post_ids)
+    for post in posts:
+        post.like_count = like_counts[post.id]
+        post.liked = post.id in liked
+    return posts
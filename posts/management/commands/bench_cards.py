@@ -0,0 +1,67 @@
+"""Сравнивает страницу ленты из моделей и из карточек posts.readmodels:
+число выделений памяти, объём живых объектов и размер в кеше.
+
+    python manage.py bench_cards --per-page 10
+"""
+import pickle
+import tracemalloc
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+
+from posts.models import Post
+from posts.readmodels import PostCards
+
+
+def feed(queryset):
+    """Лента из моделей: записи со всем, что выводит `post_item.html`."""
+    return queryset.select_related('author', 'group').annotate(
+        comment_count=Count('comments'),
+    )
+
+
+def measure(build):
+    """(выделений, байт, результат) для объектов, созданных `build()`."""
+    # Первый вызов прогревает компиляцию запроса и кеши Django.
+    build()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    page = build()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    stats = after.compare_to(before, 'lineno')
+    blocks = sum(stat.count_diff for stat in stats if stat.count_diff > 0)
+    size = sum(stat.size_diff for stat in stats if stat.size_diff > 0)
+    return blocks, size, page
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает расход памяти на страницу ленты: модели и карточки'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--per-page', type=int, default=10)
+
+    def handle(self, *args, **options):
+        size = options['per_page']
+        if not Post.objects.exists():
+            raise CommandError('В базе нет записей')
+        variants = {
+            'models': lambda: list(feed(Post.objects.all())[:size]),
+            # CardList ленивый: list() включает в замер и сами карточки.
+            'cards': lambda: list(PostCards(Post.objects.all())[:size]),
+        }
+        results = {}
+        for name, build in variants.items():
+            blocks, allocated, page = measure(build)
+            pickled = len(pickle.dumps(page))
+            results[name] = (blocks, allocated, pickled)
+            self.stdout.write(
+                f'{name:7} записей: {len(page):3}  выделений: {blocks:6}  '
+                f'байт: {allocated:8}  pickle: {pickled:7} байт'
+            )
+        models, cards = results['models'], results['cards']
+        self.stdout.write(
+            f'экономия: выделений {models[0] / max(cards[0], 1):.1f}x, '
+            f'памяти {models[1] / max(cards[1], 1):.1f}x, '
+            f'в кеше {models[2] / max(cards[2], 1):.1f}x'
+        )
@@ -0,0 +1,80 @@
+"""Микробенчмарк рендеринга ленты: цикл с `{% include %}` против
+`{% render_feed %}`. Записи создаются в памяти, база не нужна.
+
+    python manage.py bench_feed --posts 10 --repeat 200
+"""
+import timeit
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.template import engines
+from django.utils import timezone
+
+from posts.models import Group, Post
+
+
+User = get_user_model()
+
+INCLUDE_LOOP = (
+    '{% for post in page %}'
+    '{% include "post_item.html" with post=post %}'
+    '{% endfor %}'
+)
+SINGLE_PASS = '{% load feed %}{% render_feed page %}'
+
+
+def fake_page(size):
+    group = Group(id=1, title='Бенчмарк', slug='bench')
+    page = []
+    for number in range(1, size + 1):
+        author = User(id=number, username=f'author{number}')
+        post = Post(
+            id=number,
+            text=f'Запись {number}\nвторая строка',
+            author=author,
+            group=group if number % 2 else None,
+            pub_date=timezone.now(),
+        )
+        post.render()
+        post.comment_count = number % 3
+        post.like_count, post.liked = number % 5, False
+        page.append(post)
+    return page
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает рендеринг ленты через include и через render_feed'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=10)
+        parser.add_argument('--repeat', type=int, default=200)
+
+    def handle(self, *args, **options):
+        engine = engines['django']
+        context = {'page': fake_page(options['posts']),
+                   'user': AnonymousUser()}
+        variants = {
+            'include': engine.from_string(INCLUDE_LOOP),
+            'render_feed': engine.from_string(SINGLE_PASS),
+        }
+        outputs = {
+            name: ' '.join(template.render(context).split())
+            for name, template in variants.items()
+        }
+        if outputs['include'] != outputs['render_feed']:
+            raise CommandError('Результаты рендеринга различаются')
+        timings = {}
+        for name, template in variants.items():
+            timings[name] = min(timeit.repeat(
+                lambda: template.render(context),
+                number=options['repeat'],
+                repeat=5,
+            )) / options['repeat']
+            self.stdout.write(
+                f'{name:12} {timings[name] * 1000:8.3f} мс на страницу '
+                f'из {options["posts"]} записей'
+            )
+        self.stdout.write(
+            f'ускорение: {timings["include"] / timings["render_feed"]:.2f}x'
+        )
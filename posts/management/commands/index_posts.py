@@ -0,0 +1,34 @@
+"""Заполняет теги и упоминания для уже существующих записей.
+
+    python manage.py index_posts --batch-size 500
+"""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.models import Post
+from posts.signals import index_pages
+from posts.tagging import index_posts
+from yatube import pagecache
+
+
+class Command(BaseCommand):
+    help = 'Разбирает теги и упоминания в текстах всех записей'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        posts = Post.objects.only('id', 'text').order_by('id')
+        last_id = 0
+        total = 0
+        while True:
+            batch = list(posts.filter(id__gt=last_id)[:options['batch_size']])
+            if not batch:
+                break
+            with transaction.atomic():
+                tags, usernames = index_posts(batch)
+            pagecache.invalidate(*index_pages(tags, usernames))
+            last_id = batch[-1].id
+            total += len(batch)
+            self.stdout.write(f'обработано {total}')
+        self.stdout.write(f'Готово: {total} записей')
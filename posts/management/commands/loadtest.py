@@ -0,0 +1,417 @@
+"""Нагрузочный прогон WSGI-приложения yatube прямо в процессе.
+
+    python manage.py loadtest --workers 8 --duration 30
+    python manage.py loadtest --mix index=50,profile=50 --mode process
+    python manage.py loadtest --cache locmem --cache dummy
+    python manage.py loadtest --compare yatube.settings,yatube.settings_alt
+
+Запросы на запись (comment, new_post) создают настоящие записи, поэтому
+для прогонов лучше использовать отдельную копию базы (`--settings`).
+"""
+import io
+import json
+import multiprocessing
+import random
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from importlib import import_module
+from urllib.parse import urlencode
+from wsgiref.util import setup_testing_defaults
+
+from django.conf import settings
+from django.contrib.auth import get_user_model, login
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.http import HttpRequest
+from django.middleware.csrf import get_token
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from posts.models import Group, Post
+
+
+User = get_user_model()
+
+DEFAULT_MIX = 'index=55,group=15,profile=15,post=10,comment=4,new_post=1'
+CACHE_BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'dummy': 'django.core.cache.backends.dummy.DummyCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+}
+PERCENTILES = (50, 90, 99)
+
+
+def parse_mix(value):
+    """`index=70,profile=30` -> {'index': 70.0, 'profile': 30.0}."""
+    mix = {}
+    for item in value.split(','):
+        name, _, weight = item.partition('=')
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise CommandError(
+                f'Неизвестный сценарий `{name}`, '
+                f'доступны: {", ".join(SCENARIOS)}'
+            )
+        try:
+            mix[name] = float(weight)
+        except ValueError:
+            raise CommandError(f'Некорректный вес сценария `{item}`')
+    if not sum(mix.values()) > 0:
+        raise CommandError('Сумма весов сценариев должна быть больше нуля')
+    return mix
+
+
+def percentile(values, percent):
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, int(len(values) * percent / 100))
+    return values[index]
+
+
+class Dataset:
+    """Идентификаторы существующих объектов, из которых строятся запросы."""
+
+    def __init__(self, username):
+        self.posts = list(
+            Post.objects.values_list('author__username', 'id')[:1000]
+        )
+        self.groups = list(Group.objects.values_list('slug', flat=True))
+        self.usernames = list(
+            User.objects.values_list('username', flat=True)[:1000]
+        )
+        if not self.posts or not self.usernames:
+            raise CommandError(
+                'В базе нет записей: нагрузочный прогон не имеет смысла'
+            )
+        user = (
+            User.objects.filter(username=username).first() if username
+            else User.objects.filter(posts__isnull=False).first()
+        )
+        if user is None:
+            raise CommandError(f'Пользователь `{username}` не найден')
+        self.cookie = self.login(user)
+
+    @staticmethod
+    def login(user):
+        """Сессия и CSRF-токен пользователя в виде заголовка Cookie."""
+        request = HttpRequest()
+        engine = import_module(settings.SESSION_ENGINE)
+        request.session = engine.SessionStore()
+        login(request, user, settings.AUTHENTICATION_BACKENDS[0])
+        request.session.save()
+        token = get_token(request)
+        return token, (
+            f'{settings.SESSION_COOKIE_NAME}={request.session.session_key}; '
+            f'{settings.CSRF_COOKIE_NAME}={request.META["CSRF_COOKIE"]}'
+        )
+
+
+def index_request(data):
+    page = random.choice(('', '', '', '2', '3'))
+    return 'GET', reverse('index'), {'page': page} if page else {}
+
+
+def group_request(data):
+    if not data.groups:
+        return index_request(data)
+    return 'GET', reverse('group', args=[random.choice(data.groups)]), {}
+
+
+def profile_request(data):
+    return 'GET', reverse('profile', args=[random.choice(data.usernames)]), {}
+
+
+def post_request(data):
+    return 'GET', reverse('post', args=random.choice(data.posts)), {}
+
+
+def comment_request(data):
+    url = reverse('add_comment', args=random.choice(data.posts))
+    return 'POST', url, {'text': 'loadtest comment'}
+
+
+def new_post_request(data):
+    return 'POST', reverse('new_post'), {'text': 'loadtest post'}
+
+
+SCENARIOS = {
+    'index': index_request,
+    'group': group_request,
+    'profile': profile_request,
+    'post': post_request,
+    'comment': comment_request,
+    'new_post': new_post_request,
+}
+
+
+def call(application, method, path, params, cookie, token):
+    """Один запрос к WSGI-приложению, возвращает код ответа."""
+    environ = {
+        'REQUEST_METHOD': method,
+        'PATH_INFO': path,
+        'HTTP_COOKIE': cookie,
+    }
+    setup_testing_defaults(environ)
+    if method == 'POST':
+        body = urlencode({**params, 'csrfmiddlewaretoken': token}).encode()
+        environ.update({
+            'CONTENT_TYPE': 'application/x-www-form-urlencoded',
+            'CONTENT_LENGTH': str(len(body)),
+            'wsgi.input': io.BytesIO(body),
+        })
+    else:
+        environ['QUERY_STRING'] = urlencode(params)
+    status = []
+
+    def start_response(value, headers, exc_info=None):
+        status.append(int(value.split()[0]))
+
+    result = application(environ, start_response)
+    try:
+        for _ in result:
+            pass
+    finally:
+        if hasattr(result, 'close'):
+            result.close()
+    return status[0]
+
+
+def worker(application, data, mix, deadline, results):
+    """Шлёт запросы по смеси `mix` до `deadline`, копит результаты."""
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    token, cookie = data.cookie
+    latencies = defaultdict(list)
+    statuses = defaultdict(Counter)
+    try:
+        while time.monotonic() < deadline:
+            name = random.choices(names, weights)[0]
+            method, path, params = SCENARIOS[name](data)
+            start = time.perf_counter()
+            try:
+                status = call(application, method, path, params, cookie, token)
+            except Exception:
+                status = 'exception'
+            latencies[name].append(time.perf_counter() - start)
+            statuses[name][status] += 1
+    finally:
+        connections.close_all()
+    results.append((dict(latencies), dict(statuses)))
+
+
+def run_threads(application, data, mix, workers, duration):
+    results = []
+    deadline = time.monotonic() + duration
+    threads = [
+        threading.Thread(
+            target=worker,
+            args=(application, data, mix, deadline, results),
+        )
+        for _ in range(workers)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def process_main(application, data, mix, threads, duration, queue):
+    queue.put(run_threads(application, data, mix, threads, duration))
+
+
+def run_processes(application, data, mix, workers, threads, duration):
+    # Дочерние процессы не должны наследовать открытые соединения с БД.
+    connections.close_all()
+    context = multiprocessing.get_context('fork')
+    queue = context.Queue()
+    processes = [
+        context.Process(
+            target=process_main,
+            args=(application, data, mix, threads, duration, queue),
+        )
+        for _ in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    results = []
+    for _ in processes:
+        results.extend(queue.get())
+    for process in processes:
+        process.join()
+    return results
+
+
+def summarize(results, elapsed):
+    """Сводная статистика: общая и по каждому сценарию."""
+    latencies = defaultdict(list)
+    statuses = defaultdict(Counter)
+    for worker_latencies, worker_statuses in results:
+        for name, values in worker_latencies.items():
+            latencies[name].extend(values)
+        for name, counter in worker_statuses.items():
+            statuses[name].update(counter)
+    latencies['total'] = [
+        value for name in list(latencies) for value in latencies[name]
+    ]
+    for counter in list(statuses.values()):
+        statuses['total'].update(counter)
+    summary = {}
+    for name, values in latencies.items():
+        values.sort()
+        errors = sum(
+            count for status, count in statuses[name].items()
+            if status == 'exception' or status >= 400
+        )
+        summary[name] = {
+            'requests': len(values),
+            'rps': len(values) / elapsed if elapsed else 0.0,
+            'errors': errors / len(values) if values else 0.0,
+            'statuses': {str(k): v for k, v in statuses[name].items()},
+            **{
+                f'p{p}': percentile(values, p) * 1000 for p in PERCENTILES
+            },
+            'max': (values[-1] if values else 0.0) * 1000,
+        }
+    return summary
+
+
+class Command(BaseCommand):
+    help = 'Нагрузочный прогон WSGI-приложения в процессе со смесью запросов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=4,
+            help='Число потоков (или процессов в режиме process).',
+        )
+        parser.add_argument(
+            '--threads', type=int, default=1,
+            help='Потоков в каждом процессе в режиме process.',
+        )
+        parser.add_argument(
+            '--mode', choices=('thread', 'process'), default='thread',
+        )
+        parser.add_argument(
+            '--duration', type=float, default=10.0,
+            help='Длительность прогона в секундах.',
+        )
+        parser.add_argument(
+            '--mix', default=DEFAULT_MIX,
+            help=f'Смесь запросов в процентах, по умолчанию {DEFAULT_MIX}.',
+        )
+        parser.add_argument(
+            '--user',
+            help='Пользователь для запросов на запись '
+                 '(по умолчанию любой автор).',
+        )
+        parser.add_argument(
+            '--cache', action='append', default=[],
+            help='Прогнать с другим бэкендом кеша: '
+                 f'{", ".join(CACHE_BACKENDS)} или путь к классу. '
+                 'Можно указать несколько раз для сравнения.',
+        )
+        parser.add_argument(
+            '--compare',
+            help='Модули настроек через запятую: каждый прогоняется '
+                 'в отдельном процессе, результаты сводятся в таблицу.',
+        )
+        parser.add_argument(
+            '--json', action='store_true',
+            help='Вывести результат в JSON.',
+        )
+
+    def handle(self, *args, **options):
+        mix = parse_mix(options['mix'])
+        if options['compare']:
+            runs = self.compare(options['compare'].split(','), options)
+        else:
+            runs = self.run_local(mix, options)
+        if options['json']:
+            self.stdout.write(json.dumps(runs))
+        else:
+            self.report(runs)
+
+    def run_local(self, mix, options):
+        from yatube.wsgi import application
+
+        data = Dataset(options['user'])
+        caches = options['cache'] or [None]
+        runs = {}
+        for cache in caches:
+            label = cache or 'default'
+            if cache is None:
+                runs[label] = self.run(application, data, mix, options)
+                continue
+            backend = CACHE_BACKENDS.get(cache, cache)
+            with override_settings(CACHES={'default': {
+                'BACKEND': backend,
+                'LOCATION': f'/tmp/yatube-loadtest-{cache}',
+            }}):
+                runs[label] = self.run(application, data, mix, options)
+        return runs
+
+    def run(self, application, data, mix, options):
+        start = time.monotonic()
+        if options['mode'] == 'process':
+            results = run_processes(
+                application, data, mix, options['workers'],
+                options['threads'], options['duration'],
+            )
+        else:
+            results = run_threads(
+                application, data, mix, options['workers'],
+                options['duration'],
+            )
+        return summarize(results, time.monotonic() - start)
+
+    def compare(self, modules, options):
+        runs = {}
+        for module in modules:
+            command = [
+                sys.executable, sys.argv[0], 'loadtest', '--json',
+                f'--settings={module}',
+                f'--workers={options["workers"]}',
+                f'--threads={options["threads"]}',
+                f'--mode={options["mode"]}',
+                f'--duration={options["duration"]}',
+                f'--mix={options["mix"]}',
+            ]
+            if options['user']:
+                command.append(f'--user={options["user"]}')
+            output = subprocess.run(
+                command, check=True, stdout=subprocess.PIPE,
+            ).stdout
+            for label, summary in json.loads(output).items():
+                runs[f'{module}:{label}'] = summary
+        return runs
+
+    def report(self, runs):
+        columns = ('requests', 'rps', 'errors') + tuple(
+            f'p{p}' for p in PERCENTILES
+        ) + ('max',)
+        header = f'{"":24}' + ''.join(f'{c:>10}' for c in columns)
+        for label, summary in runs.items():
+            self.stdout.write(self.style.MIGRATE_HEADING(label))
+            self.stdout.write(header)
+            for name, row in sorted(summary.items()):
+                self.stdout.write(
+                    f'{name:24}'
+                    f'{row["requests"]:>10}'
+                    f'{row["rps"]:>10.1f}'
+                    f'{row["errors"]:>10.2%}'
+                    + ''.join(
+                        f'{row[c]:>10.1f}' for c in columns[3:]
+                    )
+                )
+        if len(runs) > 1:
+            self.stdout.write(self.style.MIGRATE_HEADING('Сравнение'))
+            for label, summary in runs.items():
+                total = summary['total']
+                self.stdout.write(
+                    f'{label:40} {total["rps"]:>10.1f} rps '
+                    f'p99 {total["p99"]:>8.1f} ms '
+                    f'ошибок {total["errors"]:.2%}'
+                )
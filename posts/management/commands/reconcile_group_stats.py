@@ -0,0 +1,18 @@
+"""Пересчитывает статистику сообществ (posts.groupstats) по записям.
+
+    0 * * * * python manage.py reconcile_group_stats
+"""
+from django.core.management.base import BaseCommand
+from django.urls import reverse
+
+from posts.groupstats import reconcile
+from yatube import pagecache
+
+
+class Command(BaseCommand):
+    help = 'Сверяет статистику сообществ с записями'
+
+    def handle(self, *args, **options):
+        total = reconcile()
+        pagecache.invalidate(reverse('groups'))
+        self.stdout.write(f'Готово: {total} сообществ')
@@ -0,0 +1,57 @@
+"""Перерендеривает сохранённый HTML записей (text_html, preview) после
+изменения правил форматирования, то есть RENDERER_VERSION.
+
+    python manage.py rerender_posts              # только устаревшие
+    python manage.py rerender_posts --all --batch-size 1000
+"""
+from django.core.management.base import BaseCommand
+
+from posts import details
+from posts.models import RENDERER_VERSION, Post
+from posts.signals import post_pages
+from yatube import generations, pagecache
+
+
+RENDERED_FIELDS = ('text_html', 'preview', 'preview_truncated', 'html_version')
+
+
+class Command(BaseCommand):
+    help = 'Перерендеривает HTML записей, сохранённый старой версией'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Перерендерить все записи, а не только устаревшие',
+        )
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        posts = Post.objects.select_related('author', 'group').only(
+            'id', 'text', 'author__username', 'group__slug',
+        ).order_by('id')
+        if not options['all']:
+            posts = posts.filter(html_version__lt=RENDERER_VERSION)
+        last_id = 0
+        total = 0
+        while True:
+            batch = list(
+                posts.filter(id__gt=last_id)[:options['batch_size']]
+            )
+            if not batch:
+                break
+            paths = []
+            for post in batch:
+                post.render()
+                paths.extend(post_pages(post))
+            # bulk_update не шлёт сигналов, кеш сбрасываем сами.
+            Post.objects.bulk_update(batch, RENDERED_FIELDS)
+            pagecache.invalidate(*paths)
+            generations.bump(*(details.generation(post.id) for post in batch))
+            last_id = batch[-1].id
+            total += len(batch)
+            self.stdout.write(f'перерендерено {total}')
+        if total:
+            generations.bump('posts')
+        self.stdout.write(
+            f'Готово: {total} записей, версия рендерера {RENDERER_VERSION}'
+        )
@@ -0,0 +1,43 @@
+"""Пересчитывает рекомендации подписок (posts.suggestions) для
+пользователей из очереди, с `--all` — для всех подписчиков.
+
+    */10 * * * * python manage.py suggest_follows
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.models import Follow
+from posts.suggestions import FollowGraph, refresh, take_stale
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает рекомендации «на кого подписаться»'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Пересчитать всех, а не только пользователей из очереди',
+        )
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        start = time.monotonic()
+        if options['all']:
+            users = list(Follow.objects.values_list(
+                'user_id', flat=True,
+            ).distinct())
+        else:
+            users = take_stale()
+        if not users:
+            self.stdout.write('Пересчитывать некого')
+            return
+        graph = FollowGraph.load()
+        loaded = time.monotonic()
+        refresh(users, graph, options['batch_size'])
+        self.stdout.write(
+            f'Пользователей: {len(users)}, '
+            f'рёбер: {len(graph.following.targets)}, '
+            f'загрузка {loaded - start:.2f} с, '
+            f'расчёт {time.monotonic() - loaded:.2f} с'
+        )
@@ -0,0 +1,19 @@
+"""Пересчитывает рейтинг популярного (posts.trending). Запускается
+по расписанию, например раз в пять минут:
+
+    */5 * * * * python manage.py update_trending
+"""
+from django.core.management.base import BaseCommand
+
+from posts import trending
+
+
+class Command(BaseCommand):
+    help = 'Обновляет рейтинг популярных записей и сообществ'
+
+    def handle(self, *args, **options):
+        result = trending.refresh()
+        self.stdout.write(
+            f'Записей: {len(result["posts"])}, '
+            f'сообществ: {len(result["groups"])}'
+        )
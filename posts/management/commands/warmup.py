@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from yatube.warmup import warm_up
+
+
+class Command(BaseCommand):
+    help = ('Прогрев: компиляция шаблонов, таблицы URL, sorl/PIL '
+            'и кеши верхних страниц лент')
+
+    def handle(self, *args, **options):
+        for name, seconds, result in warm_up():
+            self.stdout.write(f'{name:12} {seconds * 1000:8.1f} мс  {result}')
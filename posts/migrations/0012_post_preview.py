@@ -0,0 +1,49 @@
+# Generated by Django 2.2.6 on 2026-10-19 19:40
+
+from django.db import migrations, models
+from django.template.defaultfilters import linebreaksbr
+from django.utils.text import Truncator
+
+# Копия posts.models.make_preview на момент миграции: миграция
+# не должна меняться вместе с кодом приложения.
+PREVIEW_LENGTH = 500
+
+
+def make_preview(text):
+    preview = Truncator(text).chars(PREVIEW_LENGTH)
+    return (
+        linebreaksbr(preview, autoescape=True),
+        len(text) > PREVIEW_LENGTH,
+    )
+
+
+def fill_previews(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    posts = []
+    for post in Post.objects.only('id', 'text').iterator():
+        post.preview, post.preview_truncated = make_preview(post.text)
+        posts.append(post)
+    Post.objects.bulk_update(
+        posts, ['preview', 'preview_truncated'], batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0011_auto_20200908_1727'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='preview',
+            field=models.TextField(default='', editable=False, verbose_name='Превью'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='preview_truncated',
+            field=models.BooleanField(default=False, editable=False, verbose_name='Текст обрезан в превью'),
+        ),
+        migrations.RunPython(fill_previews, migrations.RunPython.noop),
+    ]
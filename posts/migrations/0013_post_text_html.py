@@ -0,0 +1,45 @@
+# Generated by Django 2.2.6 on 2026-10-19 19:41
+
+from django.db import migrations, models
+from django.template.defaultfilters import linebreaksbr
+
+# Копия posts.models.render_text версии 1: новые версии рендерера
+# перерисовывает команда rerender_posts, а не эта миграция.
+RENDERER_VERSION = 1
+
+
+def render_text(text):
+    return linebreaksbr(text, autoescape=True)
+
+
+def fill_text_html(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    posts = []
+    for post in Post.objects.only('id', 'text').iterator():
+        post.text_html = render_text(post.text)
+        post.html_version = RENDERER_VERSION
+        posts.append(post)
+    Post.objects.bulk_update(
+        posts, ['text_html', 'html_version'], batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0012_post_preview'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='html_version',
+            field=models.PositiveSmallIntegerField(default=0, editable=False, verbose_name='Версия рендерера'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='text_html',
+            field=models.TextField(default='', editable=False, verbose_name='Текст записи в HTML'),
+        ),
+        migrations.RunPython(fill_text_html, migrations.RunPython.noop),
+    ]
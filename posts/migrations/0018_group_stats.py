@@ -0,0 +1,74 @@
+# Generated by Django 2.2.6 on 2026-10-19 19:51
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Max
+import django.db.models.deletion
+
+
+def fill_stats(apps, schema_editor):
+    Group = apps.get_model('posts', 'Group')
+    Post = apps.get_model('posts', 'Post')
+    GroupStats = apps.get_model('posts', 'GroupStats')
+    GroupAuthorCount = apps.get_model('posts', 'GroupAuthorCount')
+    GroupStats.objects.bulk_create([
+        GroupStats(
+            group_id=group_id, post_count=post_count,
+            author_count=author_count, last_activity=last_activity,
+        )
+        for group_id, post_count, author_count, last_activity in
+        Group.objects.annotate(
+            post_count=Count('posts'),
+            author_count=Count('posts__author', distinct=True),
+            last_activity=Max('posts__pub_date'),
+        ).values_list('id', 'post_count', 'author_count', 'last_activity')
+    ], batch_size=500)
+    GroupAuthorCount.objects.bulk_create([
+        GroupAuthorCount(group_id=group_id, author_id=author_id, count=count)
+        for group_id, author_id, count in
+        Post.objects.filter(group__isnull=False).order_by()
+        .values('group_id', 'author_id').annotate(count=Count('id'))
+        .values_list('group_id', 'author_id', 'count')
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0017_follow_suggestions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GroupStats',
+            fields=[
+                ('group', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='posts.Group', verbose_name='Сообщество')),
+                ('post_count', models.IntegerField(default=0, verbose_name='Записей')),
+                ('author_count', models.IntegerField(default=0, verbose_name='Авторов')),
+                ('last_activity', models.DateTimeField(blank=True, null=True, verbose_name='Последняя запись')),
+            ],
+            options={
+                'verbose_name': 'Статистика сообщества',
+                'verbose_name_plural': 'Статистика сообществ',
+            },
+        ),
+        migrations.CreateModel(
+            name='GroupAuthorCount',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('count', models.IntegerField(default=0, verbose_name='Записей')),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Автор')),
+                ('group', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='author_counts', to='posts.Group', verbose_name='Сообщество')),
+            ],
+            options={
+                'verbose_name': 'Записи автора в сообществе',
+                'verbose_name_plural': 'Записи авторов в сообществах',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='groupauthorcount',
+            constraint=models.UniqueConstraint(fields=('group', 'author'), name='unique_group_author'),
+        ),
+        migrations.RunPython(fill_stats, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,8 @@
+from django.conf import settings
 from django.db import models
 from django.contrib.auth import get_user_model
+from django.template.defaultfilters import linebreaksbr
+from django.utils.text import Truncator
 
 
 User = get_user_model()
@@ -27,10 +30,69 @@ class Group(models.Model):
         verbose_name_plural = 'Сообщества'
 
 
+# Версия правил форматирования текста записи. При изменении render_text
+# её нужно увеличить и перерендерить записи: manage.py rerender_posts.
+RENDERER_VERSION = 1
+
+
+def render_text(text):
+    """Безопасный HTML текста записи: экранирование и <br> вместо
+    переводов строк.
+    """
+    return linebreaksbr(text, autoescape=True)
+
+
+def make_preview(text):
+    """Начало текста для лент, отрендеренное render_text.
+
+    Возвращает (html, обрезан ли текст).
+    """
+    length = settings.POST_PREVIEW_LENGTH
+    preview = Truncator(text).chars(length)
+    return render_text(preview), len(text) > length
+
+
+class Tag(models.Model):
+    name = models.CharField(
+        max_length=100,
+        unique=True,
+        verbose_name='Тег',
+    )
+
+    def __str__(self):
+        return self.name
+
+    class Meta:
+        verbose_name = 'Тег'
+        verbose_name_plural = 'Теги'
+
+
 class Post(models.Model):
     text = models.TextField(
         verbose_name='Текст записи',
     )
+    # Поля ниже заполняет render() при сохранении: шаблоны выводят
+    # готовый HTML, ленты читают только превью.
+    text_html = models.TextField(
+        default='',
+        editable=False,
+        verbose_name='Текст записи в HTML',
+    )
+    html_version = models.PositiveSmallIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Версия рендерера',
+    )
+    preview = models.TextField(
+        default='',
+        editable=False,
+        verbose_name='Превью',
+    )
+    preview_truncated = models.BooleanField(
+        default=False,
+        editable=False,
+        verbose_name='Текст обрезан в превью',
+    )
     pub_date = models.DateTimeField(
         auto_now_add=True,
         verbose_name='Дата публикации',
@@ -55,10 +117,38 @@ class Post(models.Model):
         null=True,
         verbose_name='Изображение',
     )
+    # Пишется пачками из счётчиков в памяти, см. posts.viewcounts.
+    views = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Просмотры',
+    )
+    # Заполняются из текста при сохранении, см. posts.tagging.
+    tags = models.ManyToManyField(
+        Tag,
+        blank=True,
+        related_name='posts',
+        verbose_name='Теги',
+    )
+    mentions = models.ManyToManyField(
+        User,
+        blank=True,
+        related_name='mentioned_in',
+        verbose_name='Упомянутые пользователи',
+    )
 
     def __str__(self):
         return f'{self.author.username},{self.pub_date},{self.text[:20]}'
 
+    def render(self):
+        self.text_html = render_text(self.text)
+        self.preview, self.preview_truncated = make_preview(self.text)
+        self.html_version = RENDERER_VERSION
+
+    def save(self, *args, **kwargs):
+        self.render()
+        super().save(*args, **kwargs)
+
     class Meta:
         ordering = ('-pub_date',)
         verbose_name = 'Запись'
@@ -115,5 +205,176 @@ class Follow(models.Model):
         return f'{self.user.username},{self.author.username}'
 
     class Meta:
+        # Индекс ограничения обслуживает и проверку «подписан ли».
+        constraints = [
+            models.UniqueConstraint(
+                fields=('user', 'author'), name='unique_follow',
+            ),
+        ]
         verbose_name = 'Подписка'
         verbose_name_plural = 'Подписки'
+
+
+class Like(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='likes',
+        verbose_name='Пользователь',
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='likes',
+        verbose_name='Запись',
+    )
+    created = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Дата',
+    )
+
+    def __str__(self):
+        return f'{self.user_id},{self.post_id}'
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=('user', 'post'), name='unique_like',
+            ),
+        ]
+        verbose_name = 'Лайк'
+        verbose_name_plural = 'Лайки'
+
+
+class LikeCounterShard(models.Model):
+    """Часть счётчика лайков записи, см. posts.likes."""
+
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='like_shards',
+        verbose_name='Запись',
+    )
+    shard = models.PositiveSmallIntegerField(
+        verbose_name='Номер части',
+    )
+    count = models.IntegerField(
+        default=0,
+        verbose_name='Лайков',
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=('post', 'shard'), name='unique_like_shard',
+            ),
+        ]
+        verbose_name = 'Часть счётчика лайков'
+        verbose_name_plural = 'Части счётчиков лайков'
+
+
+class FollowSuggestion(models.Model):
+    """Рекомендация «на кого подписаться», см. posts.suggestions."""
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='follow_suggestions',
+        verbose_name='Пользователь',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='suggested_to',
+        verbose_name='Автор',
+    )
+    score = models.FloatField(
+        verbose_name='Оценка',
+    )
+
+    class Meta:
+        ordering = ('-score',)
+        constraints = [
+            models.UniqueConstraint(
+                fields=('user', 'author'), name='unique_follow_suggestion',
+            ),
+        ]
+        verbose_name = 'Рекомендация подписки'
+        verbose_name_plural = 'Рекомендации подписок'
+
+
+class StaleSuggestions(models.Model):
+    """Пользователи, чьи рекомендации надо пересчитать."""
+
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='+',
+        verbose_name='Пользователь',
+    )
+
+    class Meta:
+        verbose_name = 'Устаревшие рекомендации'
+        verbose_name_plural = 'Устаревшие рекомендации'
+
+
+class GroupStats(models.Model):
+    """Статистика сообщества для каталога, см. posts.groupstats."""
+
+    group = models.OneToOneField(
+        Group,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='Сообщество',
+    )
+    post_count = models.IntegerField(
+        default=0,
+        verbose_name='Записей',
+    )
+    author_count = models.IntegerField(
+        default=0,
+        verbose_name='Авторов',
+    )
+    last_activity = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Последняя запись',
+    )
+
+    class Meta:
+        verbose_name = 'Статистика сообщества'
+        verbose_name_plural = 'Статистика сообществ'
+
+
+class GroupAuthorCount(models.Model):
+    """Число записей автора в сообществе: по переходам 0 <-> 1
+    меняется GroupStats.author_count.
+    """
+
+    group = models.ForeignKey(
+        Group,
+        on_delete=models.CASCADE,
+        related_name='author_counts',
+        verbose_name='Сообщество',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор',
+    )
+    count = models.IntegerField(
+        default=0,
+        verbose_name='Записей',
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=('group', 'author'), name='unique_group_author',
+            ),
+        ]
+        verbose_name = 'Записи автора в сообществе'
+        verbose_name_plural = 'Записи авторов в сообществах'
@@ -0,0 +1,177 @@
+"""Лёгкие объекты для рендеринга лент.
+
+Карточка записи (`post_item.html`) выводит несколько полей записи,
+имя автора и название сообщества. Вместо экземпляров Post и User
+(с хешем пароля, датами входа и прочими полями) лента строится из
+строк `values()` в объекты со `__slots__`. Они сравниваются с моделями
+по первичному ключу (`{% if user == post.author %}`) и сериализуются
+в кортеж, поэтому страница карточек занимает в кеше в разы меньше.
+Сообщество в строке — только id, Group берётся из posts.groupcache
+при сборке карточек, так что в кеше не остаётся старых названий.
+"""
+from django.db.models import Count
+
+from . import groupcache
+
+
+class AuthorCard:
+    __slots__ = ('id', 'username')
+
+    def __init__(self, id, username):
+        self.id = id
+        self.username = username
+
+    @property
+    def pk(self):
+        return self.id
+
+    def __str__(self):
+        return self.username
+
+    def __eq__(self, other):
+        return self.id == getattr(other, 'pk', None)
+
+    def __hash__(self):
+        return hash(self.id)
+
+
+class PostCard:
+    """Запись ленты: всё, что выводит `post_item.html`.
+
+    Вместо текста хранится превью (Post.preview), полный текст лентам
+    не нужен. `like_count` и `liked` проставляет posts.likes.attach,
+    в кеш они не попадают. `image` — имя файла в хранилище, его
+    понимает `{% thumbnail %}`.
+    """
+
+    __slots__ = (
+        'id', 'preview', 'preview_truncated', 'pub_date', 'image',
+        'comment_count', 'author', 'group', 'like_count', 'liked',
+    )
+
+    # Порядок совпадает с row(): сначала поля записи, затем автор и группа.
+    FIELDS = (
+        'id', 'preview', 'preview_truncated', 'pub_date', 'image',
+        'comment_count',
+        'author_id', 'author__username',
+        'group_id',
+    )
+
+    def __init__(self, id, preview, preview_truncated, pub_date, image,
+                 comment_count, author_id, username, group=None):
+        self.id = id
+        self.preview = preview
+        self.preview_truncated = preview_truncated
+        self.pub_date = pub_date
+        self.image = image
+        self.comment_count = comment_count
+        self.author = AuthorCard(author_id, username)
+        self.group = group
+
+    @classmethod
+    def from_row(cls, row, groups):
+        """Карточка из строки FIELDS (или row()); `groups` —
+        groupcache.by_id().
+        """
+        group = None
+        if row[8] is not None:
+            group = groupcache.get_by_id(groups, row[8])
+        return cls(*row[:8], group)
+
+    @property
+    def pk(self):
+        return self.id
+
+    def row(self):
+        return (self.id, self.preview, self.preview_truncated, self.pub_date,
+                self.image, self.comment_count,
+                self.author.id, self.author.username,
+                self.group.id if self.group is not None else None)
+
+    def __reduce__(self):
+        return card_from_row, (self.row(),)
+
+    def __eq__(self, other):
+        return self.id == getattr(other, 'pk', None)
+
+    def __hash__(self):
+        return hash(self.id)
+
+
+def card_from_row(row):
+    return PostCard.from_row(row, groupcache.by_id())
+
+
+class CardList:
+    """Ленивый список карточек поверх среза кортежей из `values_list()`.
+
+    Запрос выполняется при первом обращении, так что страница, чья
+    лента взята из кеша фрагментов, в БД не ходит.
+    """
+
+    def __init__(self, rows):
+        self.rows = rows
+        self._cards = None
+
+    @property
+    def cards(self):
+        if self._cards is None:
+            groups = groupcache.by_id()
+            self._cards = [PostCard.from_row(row, groups) for row in self.rows]
+        return self._cards
+
+    def __iter__(self):
+        return iter(self.cards)
+
+    def __len__(self):
+        return len(self.cards)
+
+    def __getitem__(self, index):
+        return self.cards[index]
+
+    def __reduce__(self):
+        # В кеш попадают только кортежи полей, без запроса и объектов.
+        return CardList, ([card.row() for card in self.cards],)
+
+
+class PostCards:
+    """Записи `queryset` в виде PostCard для обычного Paginator:
+
+        paginator = Paginator(PostCards(Post.objects.all()), 10)
+
+    Срез даёт CardList, так что Page.object_list состоит из карточек.
+    """
+
+    def __init__(self, queryset):
+        self.rows = queryset.annotate(
+            comment_count=Count('comments'),
+        ).values_list(*PostCard.FIELDS)
+
+    @property
+    def ordered(self):
+        return self.rows.ordered
+
+    def count(self):
+        return self.rows.count()
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return CardList(self.rows[index])
+        return card_from_row(self.rows[index])
+
+
+def keyset_page(queryset, before, size):
+    """Карточки записей с id меньше `before`, новые сначала.
+
+    В отличие от OFFSET стоимость не растёт с номером страницы.
+    Возвращает (карточки, `before` для следующей страницы или None).
+    """
+    if before is not None:
+        queryset = queryset.filter(id__lt=before)
+    cards = list(PostCards(queryset.order_by('-id'))[:size + 1])
+    if len(cards) > size:
+        return cards[:size], cards[size - 1].id
+    return cards, None
@@ -0,0 +1,248 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.contrib.flatpages.models import FlatPage
+from django.db.models.signals import (
+    m2m_changed, post_delete, post_init, post_migrate, post_save, pre_delete,
+)
+from django.dispatch import receiver
+from django.urls import reverse
+
+from yatube import flatpagecache, generations, pagecache
+from . import (
+    authors, details, groupcache, groupstats, likes, suggestions, tagging,
+    usernames,
+)
+from .models import Comment, Follow, Group, Post
+
+
+User = get_user_model()
+
+# Поколения, от которых зависят закешированные ленты. Из данных
+# пользователя карточки выводят только имя: 'authors' увеличивается
+# лишь при переименовании (см. author_changed).
+FEED_GENERATIONS = ('posts', 'groups', 'authors', 'comments')
+
+
+def feed_generation(user=None):
+    """Поколение ленты; для пользователя в него входят и его лайки,
+    чтобы своя отметка «нравится» была видна сразу.
+    """
+    names = list(FEED_GENERATIONS)
+    if user is not None and user.is_authenticated:
+        names.append(likes.user_generation(user.id))
+    return generations.key('feed', *names)
+
+
+def post_pages(post):
+    """Страницы, на которых видна запись: главная, профиль автора,
+    сообщество и сама запись. Остальные страницы записей автора
+    выводят число его записей и сбрасываются поколением автора
+    (authors.generation, см. post_view).
+    """
+    username = post.author.username
+    paths = [
+        reverse('index'),
+        reverse('profile', args=[username]),
+        reverse('post', args=[username, post.id]),
+    ]
+    if post.group_id is not None:
+        paths.append(reverse('group', args=[post.group.slug]))
+        paths.append(reverse('groups'))
+    return paths
+
+
+@receiver(post_init, sender=Post)
+def remember_group(sender, instance, **kwargs):
+    # Запись могли перенести в другое сообщество, сбросить надо обе ленты.
+    instance._initial_group_id = instance.group_id
+
+
+# Должен идти до post_changed: тот обновляет _initial_group_id.
+@receiver(post_save, sender=Post)
+def count_post(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = None if created else instance._initial_group_id
+    if previous == instance.group_id:
+        return
+    if previous is not None:
+        groupstats.post_removed(previous, instance.author_id)
+    if instance.group_id is not None:
+        groupstats.post_added(
+            instance.group_id, instance.author_id, instance.pub_date,
+        )
+
+
+@receiver(post_delete, sender=Post)
+def uncount_post(sender, instance, **kwargs):
+    if instance.group_id is not None:
+        groupstats.post_removed(instance.group_id, instance.author_id)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def post_changed(sender, instance, **kwargs):
+    generations.bump(
+        'posts',
+        authors.generation(instance.author.username),
+        details.generation(instance.id),
+    )
+    paths = post_pages(instance)
+    previous = instance._initial_group_id
+    if previous is not None and previous != instance.group_id:
+        paths.extend(
+            reverse('group', args=[slug]) for slug in
+            Group.objects.filter(pk=previous).values_list('slug', flat=True)
+        )
+        paths.append(reverse('groups'))
+    instance._initial_group_id = instance.group_id
+    pagecache.invalidate(*paths)
+
+
+def index_pages(tags, usernames):
+    """Ленты тегов и упоминаний."""
+    return [
+        *(reverse('tag', args=[name]) for name in tags),
+        *(reverse('mentions', args=[username]) for username in usernames),
+    ]
+
+
+def indexed_pages(post):
+    """Ленты тегов и упоминаний, где запись сейчас выводится."""
+    return index_pages(
+        post.tags.values_list('name', flat=True),
+        post.mentions.values_list('username', flat=True),
+    )
+
+
+@receiver(post_save, sender=Post)
+def index_post(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    before = [] if created else indexed_pages(instance)
+    tags, usernames = tagging.index_posts([instance])
+    pagecache.invalidate(*before, *index_pages(tags, usernames))
+
+
+@receiver(pre_delete, sender=Post)
+def collect_indexed_pages(sender, instance, **kwargs):
+    # После удаления записи связи с тегами уже удалены.
+    instance._indexed_pages = indexed_pages(instance)
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post(sender, instance, **kwargs):
+    pagecache.invalidate(*getattr(instance, '_indexed_pages', []))
+
+
+def group_pages(group):
+    """Лента сообщества, главная и страницы его записей с профилями
+    авторов: в карточке записи выводится название сообщества.
+    """
+    paths = [
+        reverse('index'),
+        reverse('groups'),
+        reverse('group', args=[group.slug]),
+    ]
+    for post_id, username in group.posts.values_list('id', 'author__username'):
+        paths.append(reverse('profile', args=[username]))
+        paths.append(reverse('post', args=[username, post_id]))
+    return paths
+
+
+@receiver(pre_delete, sender=Group)
+def collect_group_pages(sender, instance, **kwargs):
+    # После удаления записи сообщества уже отвязаны от него.
+    instance._pages = group_pages(instance)
+
+
+@receiver(post_save, sender=Group)
+def create_group_stats(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        groupstats.group_created(instance.id)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed(sender, instance, **kwargs):
+    groupcache.changed()
+    pagecache.invalidate(*getattr(instance, '_pages', None)
+                         or group_pages(instance))
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def comment_changed(sender, instance, **kwargs):
+    generations.bump('comments', details.generation(instance.post_id))
+    # Счётчик комментариев виден во всех лентах с этой записью,
+    # в том числе в лентах её тегов и упоминаний.
+    post = instance.post
+    pagecache.invalidate(*post_pages(post), *indexed_pages(post))
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def follow_changed(sender, instance, **kwargs):
+    # Число подписчиков и подписок выводится в профилях обоих.
+    usernames = (instance.author.username, instance.user.username)
+    generations.bump(*map(authors.generation, usernames))
+    pagecache.invalidate(
+        *(reverse('profile', args=[username]) for username in usernames)
+    )
+    suggestions.mark_stale(instance.user_id)
+
+
+def only_login(update_fields):
+    """Вход сохраняет только last_login: ни имя, ни сводки авторов
+    при этом не меняются.
+    """
+    return update_fields is not None and set(update_fields) == {'last_login'}
+
+
+@receiver(post_init, sender=User)
+def remember_username(sender, instance, **kwargs):
+    # Через __dict__: у отложенного поля чтение стало бы запросом.
+    instance._initial_username = instance.__dict__.get('username')
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def author_changed(sender, instance, update_fields=None, **kwargs):
+    """Сбрасывает сводку автора; при смене имени — и сводку под
+    старым именем, и все ленты и страницы записей с этим именем.
+    """
+    if only_login(update_fields):
+        return
+    previous = instance._initial_username
+    names = {instance.username, previous} - {None}
+    generations.bump(*map(authors.generation, names))
+    if previous is not None and previous != instance.username:
+        generations.bump('authors')
+    instance._initial_username = instance.username
+
+
+@receiver(post_save, sender=User)
+def username_saved(sender, instance, created, update_fields=None, **kwargs):
+    if created or update_fields is None or 'username' in update_fields:
+        usernames.changed()
+
+
+@receiver(post_delete, sender=User)
+def username_deleted(sender, instance, **kwargs):
+    usernames.changed()
+
+
+@receiver(post_save, sender=FlatPage)
+@receiver(post_delete, sender=FlatPage)
+@receiver(m2m_changed, sender=FlatPage.sites.through)
+def flatpage_changed(sender, **kwargs):
+    flatpagecache.invalidate()
+
+
+@receiver(post_migrate)
+def clear_cache(sender, **kwargs):
+    """Кеш общий для процессов и переживает перезапуск, поэтому после
+    пересоздания таблиц (migrate, flush в тестах) его надо сбросить.
+    """
+    if sender.name == 'posts':
+        cache.clear()
@@ -0,0 +1,154 @@
+"""Рекомендации «на кого подписаться» по графу подписок.
+
+Граф целиком загружается из Follow двумя запросами в компактные
+массивы (CSR: смещения и соседи в `array`), оценки считаются
+пересечением множеств соседей:
+
+- друзья друзей: за каждого автора, на которого подписан кто-то
+  из моих авторов, +SUGGESTIONS_FOF_WEIGHT;
+- похожие читатели: у подписчиков моих авторов косинусная близость
+  с моим набором подписок добавляется их авторам.
+
+Результат хранится в FollowSuggestion. Подписка и отписка ставят
+в очередь StaleSuggestions подписчика и его подписчиков (у них
+изменились друзья друзей); `manage.py suggest_follows` пересчитывает
+только их, с `--all` — всех.
+"""
+import math
+from array import array
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+
+from .models import Follow, FollowSuggestion, StaleSuggestions
+
+
+class Adjacency:
+    """Списки соседей в двух массивах: `targets[offsets[i]:offsets[i+1]]`
+    — соседи вершины с индексом i.
+    """
+
+    def __init__(self, pairs):
+        """`pairs` — пары (вершина, сосед), отсортированные по вершине."""
+        self.index = {}
+        self.offsets = array('l', [0])
+        self.targets = array('l')
+        for node, neighbour in pairs:
+            if node not in self.index:
+                if self.index:
+                    self.offsets.append(len(self.targets))
+                self.index[node] = len(self.index)
+            self.targets.append(neighbour)
+        self.offsets.append(len(self.targets))
+        self._sets = {}
+
+    def neighbours(self, node):
+        position = self.index.get(node)
+        if position is None:
+            return array('l')
+        return self.targets[
+            self.offsets[position]:self.offsets[position + 1]
+        ]
+
+    def neighbour_set(self, node):
+        found = self._sets.get(node)
+        if found is None:
+            found = self._sets[node] = frozenset(self.neighbours(node))
+        return found
+
+
+class FollowGraph:
+    def __init__(self, following, followers):
+        self.following = following
+        self.followers = followers
+
+    @classmethod
+    def load(cls):
+        edges = Follow.objects.values_list('user_id', 'author_id')
+        return cls(
+            Adjacency(edges.order_by('user_id', 'author_id').iterator()),
+            Adjacency(
+                (author, user) for user, author in
+                edges.order_by('author_id', 'user_id').iterator()
+            ),
+        )
+
+    def suggest(self, user, size):
+        """[(автор, оценка)] — лучшие `size` рекомендаций для `user`."""
+        mine = self.following.neighbour_set(user)
+        if not mine:
+            return []
+        scores = defaultdict(float)
+        similar = set()
+        for author in mine:
+            for candidate in self.following.neighbours(author):
+                scores[candidate] += settings.SUGGESTIONS_FOF_WEIGHT
+            readers = self.followers.neighbours(author)
+            similar.update(readers[:settings.SUGGESTIONS_MAX_READERS])
+        similar.discard(user)
+        for reader in similar:
+            theirs = self.following.neighbour_set(reader)
+            common = len(mine & theirs)
+            if common == len(theirs):
+                continue
+            similarity = common / math.sqrt(len(mine) * len(theirs))
+            for author in theirs - mine:
+                scores[author] += similarity
+        for excluded in (user, *mine):
+            scores.pop(excluded, None)
+        return sorted(scores.items(), key=lambda item: -item[1])[:size]
+
+
+def mark_stale(user_id):
+    """Ставит в очередь пользователя и его подписчиков."""
+    readers = Follow.objects.filter(author_id=user_id).values_list(
+        'user_id', flat=True,
+    )
+    StaleSuggestions.objects.bulk_create(
+        [StaleSuggestions(user_id=user_id)]
+        + [StaleSuggestions(user_id=reader) for reader in readers],
+        ignore_conflicts=True,
+    )
+
+
+def take_stale():
+    """Забирает очередь. Очередь чистится до загрузки графа, чтобы
+    подписки, сделанные во время расчёта, снова поставили в неё.
+    """
+    user_ids = list(StaleSuggestions.objects.values_list(
+        'user_id', flat=True,
+    ))
+    StaleSuggestions.objects.filter(user_id__in=user_ids).delete()
+    return user_ids
+
+
+def refresh(user_ids, graph=None, batch_size=500):
+    """Пересчитывает рекомендации `user_ids`, возвращает их число."""
+    graph = graph or FollowGraph.load()
+    user_ids = list(user_ids)
+    size = settings.SUGGESTIONS_SIZE
+    for start in range(0, len(user_ids), batch_size):
+        batch = user_ids[start:start + batch_size]
+        suggestions = [
+            FollowSuggestion(user_id=user, author_id=author, score=score)
+            for user in batch
+            for author, score in graph.suggest(user, size)
+        ]
+        with transaction.atomic():
+            FollowSuggestion.objects.filter(user_id__in=batch).delete()
+            FollowSuggestion.objects.bulk_create(suggestions)
+    return len(user_ids)
+
+
+def for_user(user, size):
+    """Имена рекомендованных авторов, на которых `user` ещё
+    не подписан, одним запросом.
+    """
+    if not user.is_authenticated:
+        return []
+    return list(
+        FollowSuggestion.objects.filter(user=user)
+        .exclude(author__following__user=user)
+        .values_list('author__username', flat=True)[:size]
+    )
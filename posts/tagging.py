@@ -0,0 +1,72 @@
+"""Теги (#тег) и упоминания (@username) в тексте записей.
+
+При сохранении записи они разбираются и записываются в таблицы связей
+Post.tags и Post.mentions, по которым строятся ленты `/tag/<name>/`
+и `/<username>/mentions/`. `index_posts` работает пачками и используется
+и при сохранении, и командой `manage.py index_posts`.
+"""
+import re
+
+from django.contrib.auth import get_user_model
+
+from .models import Post, Tag
+
+
+User = get_user_model()
+
+TAG_RE = re.compile(r'(?<![\w&])#(\w{1,100})')
+MENTION_RE = re.compile(r'(?<![\w@])@([\w.@+-]{1,150})')
+
+
+def extract_tags(text):
+    return {name.lower() for name in TAG_RE.findall(text)}
+
+
+def extract_mentions(text):
+    # Точка в конце — конец предложения, а не часть имени.
+    return {name.rstrip('.') for name in MENTION_RE.findall(text)} - {''}
+
+
+def tag_ids(names):
+    """{имя: id} тегов `names`, недостающие создаются."""
+    if not names:
+        return {}
+    Tag.objects.bulk_create(
+        [Tag(name=name) for name in names], ignore_conflicts=True,
+    )
+    return dict(
+        Tag.objects.filter(name__in=names).values_list('name', 'id')
+    )
+
+
+def index_posts(posts):
+    """Перестраивает теги и упоминания записей `posts` за несколько
+    запросов на всю пачку.
+
+    Возвращает (имена тегов, имена пользователей) из текстов — для
+    сброса кеша их лент.
+    """
+    tags = {post.id: extract_tags(post.text) for post in posts}
+    mentions = {post.id: extract_mentions(post.text) for post in posts}
+    all_tags = set().union(*tags.values())
+    all_mentions = set().union(*mentions.values())
+    ids = tag_ids(all_tags)
+    users = dict(
+        User.objects.filter(username__in=all_mentions)
+        .values_list('username', 'id')
+    ) if all_mentions else {}
+    post_ids = list(tags)
+    PostTag = Post.tags.through
+    PostMention = Post.mentions.through
+    PostTag.objects.filter(post_id__in=post_ids).delete()
+    PostMention.objects.filter(post_id__in=post_ids).delete()
+    PostTag.objects.bulk_create([
+        PostTag(post_id=post_id, tag_id=ids[name])
+        for post_id, names in tags.items() for name in names
+    ])
+    PostMention.objects.bulk_create([
+        PostMention(post_id=post_id, user_id=users[name])
+        for post_id, names in mentions.items()
+        for name in names if name in users
+    ])
+    return all_tags, set(users)
@@ -0,0 +1,31 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from posts import likes
+
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def render_feed(context, posts, card='post_item.html'):
+    """Рендерит ленту записей за один проход.
+
+    Карточка компилируется один раз (а с cached-загрузчиком — один раз
+    на процесс), дальше для каждой записи в контекст кладётся только
+    `post` и рендерится уже готовый nodelist, без поиска шаблона
+    и смены состояния render_context, которые делает `{% include %}`.
+    Записи должны содержать всё, что выводит карточка (обычно это
+    карточки posts.readmodels.PostCards); лайки для всей страницы
+    подгружаются здесь же, если их не проставило представление.
+    """
+    posts = list(posts)
+    if posts and not hasattr(posts[0], 'like_count'):
+        likes.attach(posts, context.get('user'))
+    card = context.template.engine.get_template(card)
+    parts = []
+    with context.render_context.push_state(card):
+        for post in posts:
+            with context.push(post=post):
+                parts.append(card.nodelist.render(context))
+    return mark_safe(''.join(parts))
@@ -0,0 +1,60 @@
+from django import template
+from django.core.cache.utils import make_template_fragment_key
+
+from yatube import stampede
+
+
+register = template.Library()
+
+
+class FragmentNode(template.Node):
+    def __init__(self, nodelist, timeout, name, vary_on, generation):
+        self.nodelist = nodelist
+        self.timeout = timeout
+        self.name = name
+        self.vary_on = vary_on
+        self.generation = generation
+
+    def render(self, context):
+        timeout = self.timeout.resolve(context)
+        vary_on = [var.resolve(context) for var in self.vary_on]
+        generation = (
+            self.generation.resolve(context) if self.generation else None
+        )
+        return stampede.get_or_set(
+            make_template_fragment_key(self.name, vary_on),
+            lambda: self.nodelist.render(context),
+            int(timeout),
+            generation,
+        )
+
+
+@register.tag
+def cache_fragment(parser, token):
+    """Как `{% cache %}`, но с защитой от лавины пересчётов
+    (см. yatube.stampede):
+
+        {% cache_fragment 300 index_page page.number generation=gen %}
+            ...
+        {% endcache_fragment %}
+
+    Смена `generation` не меняет ключ: пока фрагмент перестраивается,
+    остальные запросы получают предыдущую версию.
+    """
+    nodelist = parser.parse(('endcache_fragment',))
+    parser.delete_first_token()
+    bits = token.split_contents()
+    if len(bits) < 3:
+        raise template.TemplateSyntaxError(
+            f"'{bits[0]}' tag requires at least 2 arguments."
+        )
+    generation = None
+    if bits[-1].startswith('generation='):
+        generation = parser.compile_filter(bits.pop()[len('generation='):])
+    return FragmentNode(
+        nodelist,
+        parser.compile_filter(bits[1]),
+        bits[2],
+        [parser.compile_filter(bit) for bit in bits[3:]],
+        generation,
+    )
@@ -1,9 +1,39 @@
+import multiprocessing
+import os
+import pickle
+import shutil
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from io import StringIO
+
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
 from django.contrib.auth import get_user_model
-from django.urls import reverse
-from django.test import Client, TestCase
-from .models import Follow, Group, Post
+from django.contrib.flatpages.models import FlatPage
+from django.contrib.sites.models import Site
+from django.db import OperationalError, connection, transaction
+from django.template import engines
+from django.utils import timezone
+from django.urls import URLPattern, URLResolver, get_resolver, reverse
+from django.test import (
+    Client, TestCase, TransactionTestCase, override_settings,
+)
+from yatube import flatpagecache, generations, slowlog, stampede
+from yatube.cache import SQLiteCache, TwoTierCache
+from yatube.warmup import warm_up
+from yatube.querytrace import QueryRecorder
+from . import (
+    authors, groupcache, groupstats, likes, suggestions, trending, viewcounts,
+)
+from .models import (
+    RENDERER_VERSION, Comment, Follow, Group, GroupStats, Post,
+    StaleSuggestions, Tag,
+)
+from .readmodels import PostCards
+from .management.commands.bench_cards import feed
 
 
 User = get_user_model()
@@ -52,9 +82,11 @@ def context_test(test_obj, response, text):
     if paginator is not None:
         test_obj.assertEqual(paginator.count, 1)
         checked_post = response.context['page'][0]
+        # Ленты выводят только превью записи.
+        test_obj.assertIn(text, checked_post.preview)
     else:
         checked_post = response.context['post']
-    test_obj.assertEqual(checked_post.text, text)
+        test_obj.assertEqual(checked_post.text, text)
     test_obj.assertEqual(checked_post.author, test_obj.user_1)
     test_obj.assertEqual(checked_post.group, test_obj.group)
 
@@ -156,6 +188,45 @@ class PostTests(TestCase):
         edited_post = Post.objects.get(pk=post.id)
         self.assertEqual(edited_post.text, edited_text)
 
+    @override_settings(POST_PREVIEW_LENGTH=20)
+    def test_long_post_preview(self):
+        """В ленте выводится экранированное превью со ссылкой на запись,
+        полный текст — только на странице записи.
+        """
+        post = Post.objects.create(
+            text='<b>Luke</b>\n' + 'I am your father. ' * 10,
+            author=self.user_1,
+        )
+        post_url = reverse(
+            'post', kwargs={'username': USERNAME_1, 'post_id': post.id},
+        )
+        self.assertTrue(post.preview_truncated)
+        response = self.guest_client.get(INDEX_URL)
+        self.assertContains(response, '&lt;b&gt;Luke&lt;/b&gt;<br>')
+        self.assertContains(response, 'Читать далее')
+        self.assertNotContains(response, post.text[-30:])
+        response = self.guest_client.get(post_url)
+        self.assertContains(response, 'I am your father. ' * 9)
+        self.assertNotContains(response, 'Читать далее')
+
+    def test_rerender_posts(self):
+        """Команда перерендеривает записи со старой версией HTML."""
+        post = Post.objects.create(text='Line 1\nLine 2', author=self.user_1)
+        post_url = reverse(
+            'post', kwargs={'username': USERNAME_1, 'post_id': post.id},
+        )
+        Post.objects.filter(pk=post.pk).update(
+            text_html='stale', html_version=0,
+        )
+        self.assertContains(self.guest_client.get(post_url), 'stale')
+        call_command('rerender_posts', stdout=StringIO())
+        post.refresh_from_db()
+        self.assertEqual(post.text_html, 'Line 1<br>Line 2')
+        self.assertEqual(post.html_version, RENDERER_VERSION)
+        self.assertContains(
+            self.guest_client.get(post_url), 'Line 1<br>Line 2',
+        )
+
     def test_404(self):
         """Тест на код ошибки 404."""
         response = self.guest_client.get('/404/')
@@ -213,15 +284,32 @@ class PostTests(TestCase):
         )
         response = self.guest_client.get(INDEX_URL)
         self.assertContains(response, post_1.text)
+        # update() не шлёт сигналов: лента остаётся в кеше.
+        Post.objects.filter(pk=post_1.pk).update(
+            text='Edited post 1', preview='Edited post 1',
+        )
+        response = self.guest_client.get(INDEX_URL)
+        self.assertContains(response, post_1.text)
+        cache.clear()
+        response = self.guest_client.get(INDEX_URL)
+        self.assertContains(response, 'Edited post 1')
+
+    def test_cache_invalidation(self):
+        """Новая запись сразу сбрасывает закешированную ленту."""
+        cache.clear()
+        post_1 = Post.objects.create(
+            text='Post 1 for cache test ',
+            group=self.group,
+            author=self.user_1,
+        )
+        response = self.guest_client.get(INDEX_URL)
+        self.assertContains(response, post_1.text)
         post_2 = Post.objects.create(
             text='Post 2 for cache test ',
             group=self.group,
             author=self.user_1,
         )
         response = self.guest_client.get(INDEX_URL)
-        self.assertNotContains(response, post_2.text)
-        cache.clear()
-        response = self.guest_client.get(INDEX_URL)
         self.assertContains(response, post_2.text)
 
     def test_guest_user_comment_sending(self):
@@ -351,3 +439,1127 @@ class FollowTest(TestCase):
         response = self.auth_client2.get(FOLLOW_INDEX_URL)
         paginator = response.context.get('paginator')
         self.assertEqual(paginator.count, 0)
+
+
+# Допустимое число SQL-запросов на страницу (на холодном кеше).
+# В лентах два запроса — лайки страницы: число и отметки пользователя.
+QUERY_BUDGETS = {
+    'index': 6,
+    'groups': 4,
+    'group': 6,
+    'new_post': 3,
+    'follow_index': 7,
+    'profile': 8,
+    'post': 7,
+    'post_edit': 5,
+    'add_comment': 6,
+    'profile_follow': 4,
+    'profile_unfollow': 7,
+    'tag': 6,
+    'mentions': 6,
+    'post_like': 12,
+    'post_unlike': 6,
+    'trending': 2,
+    'signup': 2,
+    'about': 2,
+    'author': 2,
+    'spec': 2,
+    'terms': 2,
+    'django.contrib.flatpages.views.flatpage': 2,
+}
+# Модули представлений, маршруты которых обходит QueryBudgetTest.
+CRAWLED_VIEW_MODULES = (
+    'posts.views',
+    'users.views',
+    'yatube.flatpagecache',
+)
+FLATPAGE_URLS = ('/about-us/', '/about-author/', '/about-spec/', '/terms/')
+
+
+def crawled_patterns(patterns=None):
+    """Все именованные маршруты проекта из CRAWLED_VIEW_MODULES."""
+    if patterns is None:
+        patterns = get_resolver().url_patterns
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            yield from crawled_patterns(pattern.url_patterns)
+        elif isinstance(pattern, URLPattern) and pattern.name:
+            view = getattr(pattern.callback, 'view_class', pattern.callback)
+            if view.__module__ in CRAWLED_VIEW_MODULES:
+                yield pattern
+
+
+class QueryBudgetTest(TestCase):
+    """Число запросов каждой страницы не зависит от объёма данных
+    и не превышает бюджета из QUERY_BUDGETS.
+    """
+
+    def setUp(self):
+        self.author = User.objects.create_user(
+            username=USERNAME_1,
+            email=EMAIL_1,
+            password=PASS_1,
+        )
+        self.reader = User.objects.create_user(
+            username=USERNAME_2,
+            email=EMAIL_2,
+            password=PASS_2,
+        )
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.group = Group.objects.create(
+            title=GROUP_TITLE,
+            slug=GROUP_SLUG,
+            description=GROUP_DESC,
+        )
+        site = Site.objects.get_current()
+        for url in FLATPAGE_URLS:
+            flatpage = FlatPage.objects.create(
+                url=url, title=url, content=url,
+            )
+            flatpage.sites.add(site)
+        self.post = self.populate(2)[0]
+        self.clients = {'anonymous': Client()}
+        for user in (self.author, self.reader):
+            self.clients[user.username] = Client()
+            self.clients[user.username].force_login(user)
+
+    def populate(self, size):
+        """Добавляет size записей с size комментариями и подписчиками."""
+        posts = []
+        for i in range(size):
+            post = Post.objects.create(
+                text=f'Post {i} for #budget by @{USERNAME_1}',
+                group=self.group,
+                author=self.author,
+            )
+            posts.append(post)
+            for j in range(size):
+                commenter = User.objects.create_user(
+                    username=f'commenter_{post.id}_{j}',
+                )
+                Comment.objects.create(
+                    text=COMMENT_TEXT, author=commenter, post=post,
+                )
+                Follow.objects.create(user=commenter, author=self.author)
+        return posts
+
+    def url_for(self, pattern):
+        values = {
+            'username': self.author.username,
+            'post_id': self.post.id,
+            'slug': self.group.slug,
+            'name': 'budget',
+            'url': FLATPAGE_URLS[0].lstrip('/'),
+        }
+        kwargs = {
+            name: values[name] for name in pattern.pattern.converters
+        }
+        return reverse(pattern.name, kwargs=kwargs)
+
+    def crawl(self):
+        """Обходит все маршруты всеми клиентами, не меняя данных."""
+        results = {}
+        for pattern in crawled_patterns():
+            url = self.url_for(pattern)
+            for client_name, client in self.clients.items():
+                cache.clear()
+                recorder = QueryRecorder()
+                with transaction.atomic():
+                    with connection.execute_wrapper(recorder):
+                        response = client.get(url)
+                    transaction.set_rollback(True)
+                self.assertLess(response.status_code, 500, url)
+                results[pattern.name, client_name, url] = recorder
+        return results
+
+    def test_query_budgets(self):
+        small = self.crawl()
+        self.populate(12)
+        large = self.crawl()
+        self.assertTrue(small)
+        for key, recorder in large.items():
+            name, client_name, url = key
+            with self.subTest(url=url, client=client_name):
+                grown = recorder.by_position() - small[key].by_position()
+                self.assertFalse(
+                    grown,
+                    f'{url} ({client_name}): число запросов растёт '
+                    f'с объёмом данных '
+                    f'({len(small[key])} -> {len(recorder)}):\n'
+                    + '\n'.join(
+                        f'  +{count} [{position}] '
+                        f'{recorder.at(position)[-1].sql}'
+                        for position, count in grown.items()
+                    ),
+                )
+                self.assertLessEqual(
+                    len(recorder),
+                    QUERY_BUDGETS[name],
+                    f'{url} ({client_name}): превышен бюджет запросов '
+                    f'{QUERY_BUDGETS[name]}:\n{recorder.report()}',
+                )
+
+
+class ProfilingTest(TestCase):
+    def setUp(self):
+        self.dumps_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dumps_dir.cleanup)
+        self.staff = User.objects.create_user(
+            username=USERNAME_1,
+            password=PASS_1,
+            is_staff=True,
+        )
+        self.staff_client = Client()
+        self.staff_client.force_login(self.staff)
+        self.user = User.objects.create_user(
+            username=USERNAME_2,
+            password=PASS_2,
+        )
+        self.user_client = Client()
+        self.user_client.force_login(self.user)
+
+    def test_staff_can_profile_request(self):
+        with override_settings(PROFILING_DIR=self.dumps_dir.name):
+            response = self.staff_client.get(INDEX_URL, {'profile': ''})
+            dump = response['X-Profile-Dump']
+            self.assertIn(dump, os.listdir(self.dumps_dir.name))
+            response = self.staff_client.get(reverse('profiling'))
+        self.assertContains(response, dump)
+        self.assertContains(response, 'get_response')
+
+    def test_users_cannot_profile(self):
+        with override_settings(PROFILING_DIR=self.dumps_dir.name):
+            response = self.user_client.get(INDEX_URL, {'profile': ''})
+            self.assertFalse(response.has_header('X-Profile-Dump'))
+            response = self.user_client.get(reverse('profiling'))
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(os.listdir(self.dumps_dir.name), [])
+
+    def test_dumps_rotation(self):
+        with override_settings(
+            PROFILING_DIR=self.dumps_dir.name,
+            PROFILING_SAMPLE_RATE=1,
+            PROFILING_MAX_DUMPS=2,
+        ):
+            for _ in range(4):
+                self.user_client.get(INDEX_URL)
+        self.assertEqual(len(os.listdir(self.dumps_dir.name)), 2)
+
+
+@override_settings(SLOW_QUERY_THRESHOLD=0)
+class SlowQueryLogTest(TestCase):
+    def setUp(self):
+        slowlog.recent.clear()
+        self.staff = User.objects.create_user(
+            username=USERNAME_1,
+            password=PASS_1,
+            is_staff=True,
+        )
+        self.staff_client = Client()
+        self.staff_client.force_login(self.staff)
+        Post.objects.create(text=POST_TEXT, author=self.staff)
+
+    def test_queries_are_attributed(self):
+        cache.clear()
+        self.staff_client.get(INDEX_URL)
+        entries = [e for e in slowlog.recent if e['view'] == 'index']
+        self.assertTrue(entries)
+        self.assertTrue(any(
+            e['template'] and e['template'].startswith('index.html')
+            for e in entries
+        ))
+        self.assertTrue(all(e['plan'] for e in entries))
+
+    def test_full_scan_is_highlighted(self):
+        request = self.staff_client.get(INDEX_URL).wsgi_request
+        with connection.execute_wrapper(slowlog.SlowQueryLogger(request)):
+            list(Comment.objects.filter(text=COMMENT_TEXT))
+        self.assertEqual(slowlog.recent[-1]['full_scans'], ['posts_comment'])
+        response = self.staff_client.get(reverse('profiling'))
+        self.assertContains(response, 'Полный просмотр: posts_comment')
+
+
+class WarmUpTest(TestCase):
+    def test_warm_up(self):
+        user = User.objects.create_user(username=USERNAME_1)
+        group = Group.objects.create(
+            title=GROUP_TITLE,
+            slug=GROUP_SLUG,
+            description=GROUP_DESC,
+        )
+        Post.objects.create(text=POST_TEXT, author=user, group=group)
+        cache.clear()
+        report = {name: result for name, seconds, result in warm_up()}
+        self.assertEqual(
+            list(report), ['templates', 'urls', 'thumbnails', 'groups', 'pages'],
+        )
+        self.assertIn('ошибок: 0', report['templates'])
+        self.assertEqual(report['pages'], '4 страниц, с ошибкой: нет')
+
+
+class RenderFeedTest(TestCase):
+    def test_same_output_as_include_loop(self):
+        user = User.objects.create_user(username=USERNAME_1)
+        group = Group.objects.create(
+            title=GROUP_TITLE,
+            slug=GROUP_SLUG,
+            description=GROUP_DESC,
+        )
+        for text in ('First <b>post</b>', 'Second\npost'):
+            Post.objects.create(text=text, author=user, group=group)
+        Post.objects.create(text='Without group', author=user)
+        page = likes.attach(list(feed(Post.objects.all())), user)
+        context = {'page': page, 'user': user}
+        engine = engines['django']
+        include_loop = engine.from_string(
+            '{% for post in page %}'
+            '{% include "post_item.html" with post=post %}'
+            '{% endfor %}'
+        ).render(context)
+        single_pass = engine.from_string(
+            '{% load feed %}{% render_feed page %}'
+        ).render(context)
+        self.assertEqual(single_pass, include_loop)
+        self.assertIn('First &lt;b&gt;post&lt;/b&gt;', single_pass)
+
+    def test_cards_render_like_models(self):
+        user = User.objects.create_user(username=USERNAME_1)
+        group = Group.objects.create(title=GROUP_TITLE, slug=GROUP_SLUG)
+        post = Post.objects.create(text=POST_TEXT, author=user, group=group)
+        Comment.objects.create(text=COMMENT_TEXT, post=post, author=user)
+        Post.objects.create(text='Without group', author=user)
+        template = engines['django'].from_string(
+            '{% load feed %}{% render_feed page %}'
+        )
+        cards = PostCards(Post.objects.all())[:10]
+        self.assertEqual(
+            template.render({'page': cards, 'user': user}),
+            template.render({
+                'page': feed(Post.objects.all()), 'user': user,
+            }),
+        )
+        restored = pickle.loads(pickle.dumps(cards))
+        self.assertEqual([card.row() for card in restored],
+                         [card.row() for card in cards])
+        self.assertEqual(restored[1].author, user)
+        self.assertEqual(restored[1].group, group)
+
+
+class GenerationsTest(TestCase):
+    def test_bump_is_visible_in_other_processes(self):
+        name = f'test:{os.getpid()}'
+        before, = generations.get(name)
+        process = multiprocessing.get_context('fork').Process(
+            target=generations.bump, args=(name,),
+        )
+        process.start()
+        process.join()
+        self.assertEqual(generations.get(name), (before + 1,))
+        self.assertEqual(generations.key('base', name), f'base:{before + 1}')
+
+    def test_peek_does_not_create(self):
+        name = f'test:peek:{os.getpid()}'
+        self.assertEqual(generations.peek(name), (0,))
+        self.assertEqual(generations.peek(name), (0,))
+        generations.bump(name)
+        self.assertNotIn(generations.peek(name), ((0,), (1,)))
+
+
+class TwoTierCacheTest(TestCase):
+    def setUp(self):
+        dirname = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, dirname)
+        self.location = os.path.join(dirname, 'cache.sqlite3')
+        self.cache = self.make_cache()
+
+    def make_cache(self):
+        return TwoTierCache(self.location, {'OPTIONS': {
+            'LOCAL_MAX_BYTES': 1024,
+            'LOCAL_TIMEOUT': 60,
+            'NEGATIVE_TIMEOUT': 60,
+        }})
+
+    def test_tiers(self):
+        self.cache.set('key', 'value')
+        self.assertEqual(self.cache.get('key'), 'value')
+        self.assertIsNone(self.cache.get('missing'))
+        self.assertIsNone(self.cache.get('missing'))
+        stats = self.cache.stats()
+        self.assertEqual(stats['local_hits'], 1)
+        self.assertEqual(stats['negative_hits'], 1)
+        self.assertEqual(stats['shared_misses'], 1)
+        # Экземпляр из другого потока видит тот же локальный уровень.
+        self.assertIs(self.make_cache().local, self.cache.local)
+
+    def test_shared_tier_is_culled(self):
+        shared = SQLiteCache(self.location, {'OPTIONS': {
+            'MAX_ENTRIES': 10, 'CULL_FREQUENCY': 2, 'CULL_EVERY': 5,
+        }})
+
+        def count():
+            return shared._db.execute('SELECT COUNT(*) FROM cache').fetchone()
+
+        for number in range(14):
+            shared.set(f'key{number}', number)
+        # Последняя проверка была на 10-й записи, ключей было не больше 10.
+        self.assertEqual(count(), (14,))
+        shared.set('key14', 14)
+        # 15 > 10: удалена половина записей.
+        self.assertEqual(count(), (8,))
+
+    def test_add_is_atomic(self):
+        self.assertTrue(self.cache.add('lock', 1))
+        self.assertFalse(self.cache.shared.add('lock', 2))
+        self.assertFalse(self.cache.add('lock', 3))
+        self.assertEqual(self.cache.get('lock'), 1)
+
+    def test_local_tier_is_bounded(self):
+        for number in range(20):
+            self.cache.set(f'key{number}', 'x' * 100)
+        stats = self.cache.stats()
+        self.assertLessEqual(stats['local_bytes'], 1024)
+        self.assertGreater(stats['evictions'], 0)
+        self.assertEqual(self.cache.get('key0'), 'x' * 100)
+
+
+class PageCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.author = User.objects.create_user(username=USERNAME_1)
+        self.reader = User.objects.create_user(username=USERNAME_2)
+        self.group = Group.objects.create(
+            title=GROUP_TITLE,
+            slug=GROUP_SLUG,
+            description=GROUP_DESC,
+        )
+        self.post = Post.objects.create(
+            text=POST_TEXT, author=self.author, group=self.group,
+        )
+        self.post_url = reverse('post', args=[USERNAME_1, self.post.id])
+        self.urls = (INDEX_URL, GROUP_URL, PROFILE1_URL, self.post_url)
+
+    def cache_state(self, url):
+        return self.guest_client.get(url).get('X-Page-Cache')
+
+    def test_anonymous_pages_are_cached(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                self.assertEqual(self.cache_state(url), 'miss')
+                with self.assertNumQueries(0):
+                    self.assertEqual(self.cache_state(url), 'hit')
+        self.assertEqual(self.cache_state(f'{INDEX_URL}?page=2'), 'miss')
+        auth_client = Client()
+        auth_client.force_login(self.reader)
+        self.assertIsNone(auth_client.get(INDEX_URL).get('X-Page-Cache'))
+
+    def test_comment_invalidates_post_pages(self):
+        other_url = reverse('profile', args=[USERNAME_2])
+        for url in (*self.urls, other_url):
+            self.guest_client.get(url)
+        Comment.objects.create(
+            text=COMMENT_TEXT, post=self.post, author=self.reader,
+        )
+        for url in self.urls:
+            with self.subTest(url=url):
+                self.assertEqual(self.cache_state(url), 'miss')
+        self.assertEqual(self.cache_state(other_url), 'hit')
+
+    def test_follow_invalidates_profiles(self):
+        self.guest_client.get(PROFILE1_URL)
+        self.guest_client.get(GROUP_URL)
+        self.guest_client.get(self.post_url)
+        Follow.objects.create(user=self.reader, author=self.author)
+        response = self.guest_client.get(PROFILE1_URL)
+        self.assertEqual(response['X-Page-Cache'], 'miss')
+        self.assertContains(response, 'Подписчиков: 1')
+        response = self.guest_client.get(self.post_url)
+        self.assertEqual(response['X-Page-Cache'], 'miss')
+        self.assertContains(response, 'Подписчиков: 1')
+        self.assertEqual(self.cache_state(GROUP_URL), 'hit')
+
+    def test_new_post_invalidates_author_post_pages(self):
+        self.guest_client.get(self.post_url)
+        self.assertEqual(self.cache_state(self.post_url), 'hit')
+        Post.objects.create(text='Another post', author=self.author)
+        response = self.guest_client.get(self.post_url)
+        self.assertEqual(response['X-Page-Cache'], 'miss')
+        self.assertContains(response, 'Записей: 2')
+        self.assertEqual(self.cache_state(self.post_url), 'hit')
+
+    def test_moved_post_invalidates_both_groups(self):
+        other = Group.objects.create(title='Other', slug='other')
+        other_url = reverse('group', args=['other'])
+        self.guest_client.get(GROUP_URL)
+        self.guest_client.get(other_url)
+        post = Post.objects.get(pk=self.post.pk)
+        post.group = other
+        post.save()
+        self.assertEqual(self.cache_state(GROUP_URL), 'miss')
+        self.assertContains(self.guest_client.get(other_url), POST_TEXT)
+
+    def test_non_ascii_paths_are_invalidated(self):
+        author = User.objects.create_user(username='Иван')
+        url = reverse('profile', args=['Иван'])
+        self.guest_client.get(url)
+        self.assertEqual(self.cache_state(url), 'hit')
+        Post.objects.create(text='Новая запись', author=author)
+        response = self.guest_client.get(url)
+        self.assertEqual(response['X-Page-Cache'], 'miss')
+        self.assertContains(response, 'Новая запись')
+
+    def test_unknown_paths_leave_no_generations(self):
+        url = reverse('post', args=[USERNAME_1, 999999])
+        self.assertEqual(self.guest_client.get(url).status_code, 404)
+        names = [
+            name for name, in generations.connection().execute(
+                'SELECT name FROM generations WHERE name IN (?, ?)',
+                (f'page:{url}', 'post:999999'),
+            )
+        ]
+        self.assertEqual(names, [])
+
+    def test_stale_values_are_not_cached(self):
+        self.guest_client.get(INDEX_URL)
+        Post.objects.create(text='Another post', author=self.author)
+        # Число записей пересчитывает другой процесс: страница собрана
+        # со старым числом и в кеш не попадает.
+        cache.add(stampede.lock_key('index_count'), True)
+        self.assertIsNone(self.cache_state(INDEX_URL))
+        self.assertIsNone(self.cache_state(INDEX_URL))
+        cache.delete(stampede.lock_key('index_count'))
+        self.assertEqual(self.cache_state(INDEX_URL), 'miss')
+        self.assertEqual(self.cache_state(INDEX_URL), 'hit')
+
+
+class StampedeTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.calls = 0
+
+    def compute(self):
+        self.calls += 1
+        time.sleep(0.2)
+        return self.calls
+
+    def test_single_flight(self):
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(
+                stampede.get_or_set('fragment', self.compute, 60),
+            ))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(results, [1] * 5)
+
+    def test_stale_while_revalidate(self):
+        stampede.get_or_set('fragment', self.compute, 60, generation=1)
+        # Пока другой процесс держит блокировку, отдаётся старая версия.
+        cache.add(stampede.lock_key('fragment'), True)
+        stampede.track_stale()
+        self.assertEqual(
+            stampede.get_or_set('fragment', self.compute, 60, generation=2),
+            1,
+        )
+        self.assertTrue(stampede.served_stale())
+        cache.delete(stampede.lock_key('fragment'))
+        self.assertEqual(
+            stampede.get_or_set('fragment', self.compute, 60, generation=2),
+            2,
+        )
+
+    def test_early_recomputation(self):
+        cache.set('fragment', ('old', None, time.time() + 1, 1000), 60)
+        self.assertEqual(
+            stampede.get_or_set('fragment', self.compute, 60), 1,
+        )
+        self.assertEqual(
+            stampede.get_or_set('fragment', self.compute, 60), 1,
+        )
+
+
+class TagsAndMentionsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.author = User.objects.create_user(username=USERNAME_1)
+        self.reader = User.objects.create_user(username=USERNAME_2)
+
+    def test_tags_and_mentions_are_indexed(self):
+        post = Post.objects.create(
+            text=f'Hi #StarWars, @{USERNAME_2}. &#39; @nobody',
+            author=self.author,
+        )
+        self.assertEqual(
+            list(post.tags.values_list('name', flat=True)), ['starwars'],
+        )
+        self.assertEqual(list(post.mentions.all()), [self.reader])
+        tag_url = reverse('tag', args=['starwars'])
+        mentions_url = reverse('mentions', args=[USERNAME_2])
+        self.assertContains(self.guest_client.get(tag_url), 'StarWars')
+        self.assertContains(self.guest_client.get(mentions_url), 'StarWars')
+        post.text = 'No tags anymore'
+        post.save()
+        self.assertFalse(post.tags.exists())
+        self.assertNotContains(self.guest_client.get(tag_url), 'Hi ')
+        self.assertNotContains(self.guest_client.get(mentions_url), 'Hi ')
+
+    def test_non_ascii_tag_feed_is_invalidated(self):
+        tag_url = reverse('tag', args=['пример'])
+        self.guest_client.get(tag_url)
+        post = Post.objects.create(text='Hi #Пример', author=self.author)
+        response = self.guest_client.get(tag_url)
+        self.assertEqual(response['X-Page-Cache'], 'miss')
+        self.assertContains(response, 'Hi #Пример')
+        Comment.objects.create(
+            post=post, author=self.reader, text=COMMENT_TEXT,
+        )
+        self.assertEqual(
+            self.guest_client.get(tag_url)['X-Page-Cache'], 'miss',
+        )
+
+    def test_keyset_pagination(self):
+        posts = [
+            Post.objects.create(text=f'Post {i} #saga', author=self.author)
+            for i in range(15)
+        ]
+        tag_url = reverse('tag', args=['saga'])
+        response = self.guest_client.get(tag_url)
+        self.assertEqual(
+            [card.id for card in response.context['page']],
+            [post.id for post in posts[:4:-1]],
+        )
+        next_before = response.context['next_before']
+        self.assertEqual(next_before, posts[5].id)
+        response = self.guest_client.get(f'{tag_url}?before={next_before}')
+        self.assertEqual(len(response.context['page']), 5)
+        self.assertIsNone(response.context['next_before'])
+
+    def test_backfill(self):
+        post = Post.objects.create(text='Old #post', author=self.author)
+        post.tags.clear()
+        Tag.objects.all().delete()
+        call_command('index_posts', stdout=StringIO())
+        self.assertEqual(
+            list(post.tags.values_list('name', flat=True)), ['post'],
+        )
+
+
+class ViewCountsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        viewcounts.reset()
+        self.guest_client = Client()
+        author = User.objects.create_user(username=USERNAME_1)
+        self.post = Post.objects.create(text=POST_TEXT, author=author)
+        self.url = reverse('post', args=[USERNAME_1, self.post.id])
+
+    def test_views_are_buffered(self):
+        self.guest_client.get(self.url)
+        # Просмотр из кеша страниц тоже считается и в БД не пишет.
+        with self.assertNumQueries(0):
+            self.guest_client.get(self.url)
+        self.guest_client.get(
+            reverse('post', args=[USERNAME_1, self.post.id + 1]),
+        )
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.views, 0)
+        self.assertEqual(viewcounts.pending(self.post.id), 2)
+        self.assertEqual(viewcounts.flush(), 1)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.views, 2)
+
+    def test_failed_flush_keeps_views(self):
+        def locked(execute, sql, params, many, context):
+            if sql.startswith('UPDATE'):
+                raise OperationalError('database is locked')
+            return execute(sql, params, many, context)
+
+        self.guest_client.get(self.url)
+        with connection.execute_wrapper(locked):
+            with self.assertRaises(OperationalError):
+                viewcounts.flush()
+        self.assertEqual(viewcounts.pending(self.post.id), 1)
+        self.assertEqual(viewcounts.flush(), 1)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.views, 1)
+
+    def tearDown(self):
+        viewcounts.reset()
+
+
+class LikesTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username=USERNAME_1)
+        self.reader = User.objects.create_user(username=USERNAME_2)
+        self.client.force_login(self.reader)
+        self.posts = [
+            Post.objects.create(text=f'Post {i}', author=self.author)
+            for i in range(3)
+        ]
+
+    def like_url(self, post, name='post_like'):
+        return reverse(name, args=[USERNAME_1, post.id])
+
+    @override_settings(LIKE_COUNTER_SHARDS=4)
+    def test_sharded_count(self):
+        post = self.posts[0]
+        for number in range(10):
+            user = User.objects.create_user(username=f'fan{number}')
+            likes.like(user, post)
+        self.assertFalse(likes.like(user, post))
+        self.assertTrue(likes.unlike(user, post))
+        self.assertLessEqual(post.like_shards.count(), 4)
+        self.assertEqual(likes.counts([post.id]), {post.id: 9})
+        with self.assertNumQueries(0):
+            self.assertEqual(likes.counts([post.id]), {post.id: 9})
+
+    def test_like_state_on_feed(self):
+        self.client.get(INDEX_URL)
+        self.client.get(self.like_url(self.posts[1]))
+        response = self.client.get(INDEX_URL)
+        liked = {card.id: (card.liked, card.like_count)
+                 for card in response.context['page']}
+        self.assertEqual(liked[self.posts[1].id], (True, 1))
+        self.assertEqual(liked[self.posts[0].id], (False, 0))
+        self.assertContains(
+            response, self.like_url(self.posts[1], 'post_unlike'),
+        )
+        self.client.get(self.like_url(self.posts[1], 'post_unlike'))
+        self.assertNotContains(
+            self.client.get(INDEX_URL),
+            self.like_url(self.posts[1], 'post_unlike'),
+        )
+
+
+class LikeCountCommitTest(TransactionTestCase):
+    def test_count_dropped_after_commit(self):
+        cache.clear()
+        author = User.objects.create_user(username=USERNAME_1)
+        post = Post.objects.create(text=POST_TEXT, author=author)
+        with transaction.atomic():
+            likes.change_count(post.id, 1)
+            # Другой процесс читает сумму до коммита.
+            cache.set(likes.count_key(post.id), 0)
+        self.assertEqual(likes.counts([post.id]), {post.id: 1})
+
+
+class TrendingTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username=USERNAME_1)
+        self.group = Group.objects.create(title=GROUP_TITLE, slug=GROUP_SLUG)
+        self.commented = Post.objects.create(
+            text='Commented', author=self.author, group=self.group,
+        )
+        self.liked = Post.objects.create(text='Liked', author=self.author)
+        self.fans = [
+            User.objects.create_user(username=f'fan{number}')
+            for number in range(3)
+        ]
+
+    def ranked_ids(self):
+        return [post['id'] for post in trending.current()['posts']]
+
+    def test_incremental_ranking(self):
+        self.assertContains(
+            self.client.get(reverse('trending')), 'Рейтинг ещё не посчитан',
+        )
+        Comment.objects.create(
+            text=COMMENT_TEXT, author=self.fans[0], post=self.commented,
+        )
+        likes.like(self.fans[0], self.liked)
+        trending.refresh()
+        self.assertEqual(self.ranked_ids(), [self.commented.id, self.liked.id])
+        self.assertEqual(trending.current()['groups'][0]['slug'], GROUP_SLUG)
+        # Учтённые события второй раз не считаются.
+        trending.refresh()
+        self.assertEqual(self.ranked_ids(), [self.commented.id, self.liked.id])
+        for fan in self.fans[1:]:
+            likes.like(fan, self.liked)
+        trending.refresh()
+        self.assertEqual(self.ranked_ids(), [self.liked.id, self.commented.id])
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('trending'))
+        self.assertContains(response, 'Liked')
+
+    def test_old_activity_decays(self):
+        Comment.objects.create(
+            text=COMMENT_TEXT, author=self.fans[0], post=self.commented,
+        )
+        Comment.objects.filter(post=self.commented).update(
+            created=timezone.now() - timedelta(days=1),
+        )
+        likes.like(self.fans[0], self.liked)
+        trending.refresh()
+        self.assertEqual(self.ranked_ids(), [self.liked.id, self.commented.id])
+
+
+class SuggestionsTest(TestCase):
+    def setUp(self):
+        self.users = {
+            name: User.objects.create_user(username=name)
+            for name in ('luke', 'leia', 'han', 'chewie', 'yoda', 'lando')
+        }
+        for user, author in (
+            ('luke', 'leia'), ('luke', 'han'),
+            ('leia', 'yoda'), ('han', 'yoda'), ('han', 'chewie'),
+            ('lando', 'leia'), ('lando', 'han'), ('lando', 'luke'),
+        ):
+            self.follow(user, author)
+
+    def follow(self, user, author):
+        Follow.objects.create(
+            user=self.users[user], author=self.users[author],
+        )
+
+    def stale(self):
+        return set(StaleSuggestions.objects.values_list(
+            'user__username', flat=True,
+        ))
+
+    def test_friends_of_friends_ranked(self):
+        suggestions.refresh([self.users['luke'].id])
+        self.assertEqual(
+            suggestions.for_user(self.users['luke'], 5),
+            ['yoda', 'chewie'],
+        )
+        client = Client()
+        client.force_login(self.users['luke'])
+        self.assertContains(
+            client.get(reverse('follow_index')), 'На кого подписаться',
+        )
+        # Подписка сразу убирает автора из рекомендаций.
+        self.follow('luke', 'yoda')
+        self.assertEqual(
+            suggestions.for_user(self.users['luke'], 5), ['chewie'],
+        )
+
+    def test_follow_queues_follower_and_readers(self):
+        suggestions.take_stale()
+        self.assertEqual(self.stale(), set())
+        self.follow('luke', 'chewie')
+        self.assertEqual(self.stale(), {'luke', 'lando'})
+        call_command('suggest_follows', stdout=StringIO())
+        self.assertEqual(self.stale(), set())
+        self.assertEqual(
+            suggestions.for_user(self.users['lando'], 5), ['chewie', 'yoda'],
+        )
+
+
+class GroupStatsTest(TestCase):
+    def setUp(self):
+        self.luke = User.objects.create_user(username=USERNAME_1)
+        self.darth = User.objects.create_user(username=USERNAME_2)
+        self.group = Group.objects.create(title=GROUP_TITLE, slug=GROUP_SLUG)
+        self.other = Group.objects.create(title='Other', slug='other')
+
+    def stats(self, group):
+        return GroupStats.objects.filter(group=group).values_list(
+            'post_count', 'author_count', 'last_activity',
+        ).get()
+
+    def assertReconciled(self):
+        counted = {
+            group: self.stats(group) for group in (self.group, self.other)
+        }
+        groupstats.reconcile()
+        for group, stats in counted.items():
+            self.assertEqual(stats, self.stats(group))
+
+    def test_incremental_stats_match_reconcile(self):
+        self.assertEqual(self.stats(self.group), (0, 0, None))
+        first = Post.objects.create(
+            text=POST_TEXT, author=self.luke, group=self.group,
+        )
+        second = Post.objects.create(
+            text=POST_TEXT, author=self.luke, group=self.group,
+        )
+        third = Post.objects.create(
+            text=POST_TEXT, author=self.darth, group=self.group,
+        )
+        self.assertEqual(self.stats(self.group)[:2], (3, 2))
+        self.assertEqual(self.stats(self.group)[2], third.pub_date)
+        self.assertReconciled()
+        third.group = self.other
+        third.save()
+        self.assertEqual(self.stats(self.group)[:2], (2, 1))
+        self.assertEqual(self.stats(self.other)[:2], (1, 1))
+        first.delete()
+        self.assertEqual(self.stats(self.group)[:2], (1, 1))
+        second.group = None
+        second.save()
+        self.assertEqual(self.stats(self.group)[:2], (0, 0))
+        # Время последней записи после удаления уточняет только сверка.
+        groupstats.reconcile()
+        self.assertEqual(self.stats(self.group), (0, 0, None))
+
+    def test_directory(self):
+        Post.objects.create(text=POST_TEXT, author=self.luke, group=self.group)
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('groups'))
+        self.assertContains(response, GROUP_TITLE)
+        self.assertContains(response, 'Записей: 1')
+        self.assertContains(
+            self.client.get(reverse('group', args=[GROUP_SLUG])), 'авторов: 1',
+        )
+        # Новая запись сбрасывает закешированный каталог.
+        Post.objects.create(text=POST_TEXT, author=self.luke, group=self.group)
+        self.assertContains(self.client.get(reverse('groups')), 'Записей: 2')
+
+    def test_drifted_post_count(self):
+        for _ in range(12):
+            Post.objects.create(
+                text=POST_TEXT, author=self.luke, group=self.group,
+            )
+        # Счётчик разошёлся с таблицей до очередной сверки.
+        GroupStats.objects.filter(group=self.group).update(post_count=50)
+        response = self.client.get(f'{GROUP_URL}?page=5')
+        self.assertEqual(response.context['paginator'].count, 12)
+        self.assertEqual(response.context['page'].number, 2)
+        self.assertEqual(len(response.context['page']), 2)
+        GroupStats.objects.filter(group=self.group).update(post_count=5)
+        response = self.client.get(f'{GROUP_URL}?page=2')
+        self.assertEqual(len(response.context['page']), 2)
+
+
+class ProfileSummaryTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(
+            username=USERNAME_1, first_name='Luke', last_name='Skywalker',
+        )
+        self.reader = User.objects.create_user(username=USERNAME_2)
+        self.client.force_login(self.reader)
+        for _ in range(3):
+            Post.objects.create(text=POST_TEXT, author=self.author)
+
+    def test_summary_cached_and_invalidated(self):
+        self.client.get(PROFILE1_URL)
+        # Сводка автора из кеша: проверка подписки, рекомендации,
+        # страница записей и отметки «нравится» читателя.
+        with self.assertNumQueries(4):
+            response = self.client.get(PROFILE1_URL)
+        self.assertEqual(response.context['author'], self.author)
+        self.assertEqual(response.context['paginator'].count, 3)
+        self.assertContains(response, 'Luke Skywalker')
+        self.assertContains(response, 'Подписчиков: 0')
+        self.client.get(reverse('profile_follow', args=[USERNAME_1]))
+        Post.objects.create(text=POST_TEXT, author=self.author)
+        response = self.client.get(PROFILE1_URL)
+        self.assertContains(response, 'Подписчиков: 1')
+        self.assertContains(response, 'Записей: 4')
+        self.assertContains(response, 'Отписаться')
+
+    def test_drifted_post_count(self):
+        self.client.get(PROFILE1_URL)
+        # bulk_create не шлёт сигналов: в сводке остаются 3 записи.
+        Post.objects.bulk_create(
+            Post(text=POST_TEXT, author=self.author) for _ in range(4)
+        )
+        response = self.client.get(PROFILE1_URL)
+        self.assertEqual(response.context['paginator'].count, 7)
+        response = self.client.get(f'{PROFILE1_URL}?page=2')
+        self.assertEqual(len(response.context['page']), 2)
+
+    def test_login_keeps_summaries(self):
+        generation = authors.generation(USERNAME_1)
+        before = generations.get('authors', generation)
+        Client().force_login(self.author)
+        self.assertEqual(generations.get('authors', generation), before)
+        self.author.first_name = 'Anakin'
+        self.author.save()
+        after = generations.get('authors', generation)
+        # Правка профиля сбрасывает только сводку этого автора.
+        self.assertEqual(after[0], before[0])
+        self.assertNotEqual(after[1], before[1])
+
+    def test_rename_reaches_feeds(self):
+        self.client.get(INDEX_URL)
+        self.author.username = 'skywalker'
+        self.author.save()
+        self.assertContains(self.client.get(INDEX_URL), 'skywalker')
+        self.assertEqual(self.client.get(PROFILE1_URL).status_code, 404)
+
+    def test_missing_author(self):
+        self.assertEqual(self.client.get('/nobody/').status_code, 404)
+        User.objects.create_user(username='nobody')
+        self.assertEqual(self.client.get('/nobody/').status_code, 200)
+
+
+class PostDetailTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        viewcounts.reset()
+        self.author = User.objects.create_user(username=USERNAME_1)
+        self.reader = User.objects.create_user(username=USERNAME_2)
+        self.client.force_login(self.reader)
+        self.post = Post.objects.create(text=POST_TEXT, author=self.author)
+        self.url = reverse('post', args=[USERNAME_1, self.post.id])
+
+    def test_detail_cached_and_invalidated(self):
+        Comment.objects.create(
+            text=COMMENT_TEXT, author=self.reader, post=self.post,
+        )
+        self.client.get(self.url)
+        # Запись, комментарии и сводка автора из кеша, остаётся
+        # отметка «нравится» читателя.
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+        self.assertContains(response, COMMENT_TEXT)
+        self.assertContains(response, 'Подписчиков: 0')
+        self.client.get(reverse('profile_follow', args=[USERNAME_1]))
+        self.assertContains(self.client.get(self.url), 'Подписчиков: 1')
+        self.client.post(
+            reverse('add_comment', args=[USERNAME_1, self.post.id]),
+            {'text': 'Second comment'},
+        )
+        self.assertContains(self.client.get(self.url), 'Second comment')
+        self.post.text = 'Edited text'
+        self.post.save()
+        self.assertContains(self.client.get(self.url), 'Edited text')
+
+    def test_flushed_views_are_shown(self):
+        self.client.get(self.url)
+        self.assertEqual(self.client.get(self.url).context['post'].views, 1)
+        viewcounts.flush()
+        self.assertEqual(self.client.get(self.url).context['post'].views, 2)
+
+    @override_settings(POST_COMMENTS_PAGE=2)
+    def test_comment_pages(self):
+        for number in range(3):
+            Comment.objects.create(
+                text=f'Comment {number}', author=self.reader, post=self.post,
+            )
+        first = self.client.get(self.url)
+        # Новые комментарии сначала: только что добавленный виден сразу.
+        self.assertEqual(
+            [comment.text for comment in first.context['items']],
+            ['Comment 2', 'Comment 1'],
+        )
+        self.assertContains(self.client.get(f'{self.url}?page=2'), 'Comment 0')
+
+    def test_wrong_author(self):
+        response = self.client.get(
+            reverse('post', args=[USERNAME_2, self.post.id]),
+        )
+        self.assertEqual(response.status_code, 404)
+
+
+class NotFoundTest(TestCase):
+    def setUp(self):
+        User.objects.create_user(username=USERNAME_1)
+
+    def test_unknown_username_without_queries(self):
+        self.client.get('/wp-login.php/')
+        with self.assertNumQueries(0):
+            response = self.client.get('/favicon.ico/')
+        self.assertEqual(response.status_code, 404)
+        self.assertContains(response, '/favicon.ico/', status_code=404)
+        with self.assertNumQueries(0):
+            response = self.client.get('/<b>/12/')
+        self.assertContains(response, '/&lt;b&gt;/12/', status_code=404)
+
+    def test_new_user_is_known(self):
+        self.assertEqual(self.client.get('/newcomer/').status_code, 404)
+        User.objects.create_user(username='newcomer')
+        self.assertEqual(self.client.get('/newcomer/').status_code, 200)
+        self.assertEqual(self.client.get(PROFILE1_URL).status_code, 200)
+
+    def test_authenticated_404(self):
+        self.client.force_login(User.objects.get(username=USERNAME_1))
+        response = self.client.get('/nobody/')
+        self.assertContains(response, USERNAME_1, status_code=404)
+
+
+class FlatPageCacheTest(TestCase):
+    def setUp(self):
+        self.page = FlatPage.objects.create(
+            url='/terms/', title='Terms', content='First version',
+        )
+        self.page.sites.add(Site.objects.get_current())
+
+    def test_served_from_memory_with_etag(self):
+        response = self.client.get('/terms/')
+        self.assertContains(response, 'First version')
+        etag = response['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get('/terms/')
+        self.assertEqual(response['ETag'], etag)
+        with self.assertNumQueries(0):
+            response = self.client.get('/terms/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.page.content = 'Second version'
+        self.page.save()
+        response = self.client.get('/terms/', HTTP_IF_NONE_MATCH=etag)
+        self.assertContains(response, 'Second version')
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_site_change_and_delete(self):
+        self.assertEqual(self.client.get('/about/terms/').status_code, 200)
+        self.page.sites.clear()
+        self.assertEqual(self.client.get('/about/terms/').status_code, 404)
+        self.page.sites.add(Site.objects.get_current())
+        self.assertEqual(self.client.get('/about/terms').status_code, 301)
+        self.page.delete()
+        self.assertEqual(self.client.get('/terms/').status_code, 404)
+
+
+class FlatPageCommitTest(TransactionTestCase):
+    def test_generation_bumped_after_commit(self):
+        with transaction.atomic():
+            FlatPage.objects.create(url='/terms/', title='Terms')
+            # Другой процесс загружает страницы до коммита.
+            during, = generations.get(flatpagecache.GENERATION)
+        self.assertNotEqual(
+            generations.get(flatpagecache.GENERATION), (during,),
+        )
+
+
+class GroupCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username=USERNAME_1)
+        self.group = Group.objects.create(
+            title=GROUP_TITLE, slug=GROUP_SLUG, description=GROUP_DESC,
+        )
+        Post.objects.create(text=POST_TEXT, author=self.author, group=self.group)
+
+    def test_group_from_memory(self):
+        self.client.get(GROUP_URL)
+        cache.clear()
+        # Статистика сообщества, страница записей и число лайков.
+        with self.assertNumQueries(3):
+            response = self.client.get(GROUP_URL)
+        self.assertContains(response, GROUP_DESC)
+        self.assertContains(response, 'Записей: 1')
+        self.assertEqual(response.context['paginator'].count, 1)
+        # Неизвестный slug — 404 без запросов.
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('group', args=['unknown']))
+        self.assertEqual(response.status_code, 404)
+
+    def test_created_group_is_found(self):
+        groupcache.by_id()
+        Group.objects.create(title='New group', slug='new')
+        self.assertEqual(
+            self.client.get(reverse('group', args=['new'])).status_code, 200,
+        )
+
+    def test_rename_reaches_cached_cards(self):
+        self.client.get(INDEX_URL)
+        self.group.title = 'Renamed group'
+        self.group.save()
+        self.assertContains(self.client.get(INDEX_URL), 'Renamed group')
+        self.assertContains(self.client.get(GROUP_URL), 'Renamed group')
+
+
+def tearDownModule():
+    # Просмотры, посчитанные тестами, относятся к тестовой базе.
+    viewcounts.reset()
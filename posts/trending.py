@@ -0,0 +1,126 @@
+"""Популярные записи и сообщества.
+
+Вклад комментария или лайка затухает экспоненциально с периодом
+полураспада TRENDING_HALF_LIFE секунд. Команда `update_trending`
+(по cron) пересчитывает рейтинг инкрементально: затухает сохранённые
+очки на прошедшее время и добавляет только новые Comment и Like
+(по id после курсора). Если состояния в кеше нет, рейтинг строится
+заново по событиям за TRENDING_WINDOW секунд.
+
+Готовый к выводу рейтинг лежит в кеше под RANKING_KEY, страница
+`/trending/` читает только его.
+"""
+import math
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import Comment, Group, Like, Post
+
+
+STATE_KEY = 'trending:state'
+RANKING_KEY = 'trending:ranking'
+
+WEIGHTS = {'comment': 2.0, 'like': 1.0}
+# Очки ниже порога отбрасываются, чтобы состояние не росло.
+MIN_SCORE = 0.01
+
+
+def decay(seconds):
+    return math.exp(-math.log(2) * seconds / settings.TRENDING_HALF_LIFE)
+
+
+def new_state(now):
+    since = now - timedelta(seconds=settings.TRENDING_WINDOW)
+    # Курсоры ставятся перед первым событием окна.
+    return {
+        'computed': now,
+        'cursors': {
+            'comment': (
+                Comment.objects.filter(created__lt=since)
+                .aggregate(last=Max('id'))['last'] or 0
+            ),
+            'like': (
+                Like.objects.filter(created__lt=since)
+                .aggregate(last=Max('id'))['last'] or 0
+            ),
+        },
+        'posts': {},
+        'groups': {},
+    }
+
+
+def events(kind, cursor):
+    model = Comment if kind == 'comment' else Like
+    return model.objects.filter(id__gt=cursor).order_by('id').values_list(
+        'id', 'post_id', 'post__group_id', 'created',
+    )
+
+
+def update(state, now):
+    """Затухает очки `state` до `now` и добавляет новые события."""
+    factor = decay((now - state['computed']).total_seconds())
+    for scores in (state['posts'], state['groups']):
+        for key in list(scores):
+            scores[key] *= factor
+    posts = defaultdict(float, state['posts'])
+    groups = defaultdict(float, state['groups'])
+    for kind, weight in WEIGHTS.items():
+        for event_id, post_id, group_id, created in events(
+                kind, state['cursors'][kind]):
+            score = weight * decay(max(0, (now - created).total_seconds()))
+            posts[post_id] += score
+            if group_id is not None:
+                groups[group_id] += score
+            state['cursors'][kind] = event_id
+    keep = settings.TRENDING_KEEP
+    for name, scores in (('posts', posts), ('groups', groups)):
+        top = sorted(scores.items(), key=lambda item: -item[1])[:keep]
+        state[name] = {key: score for key, score in top if score >= MIN_SCORE}
+    state['computed'] = now
+    return state
+
+
+def ranking(state, size):
+    """Первые `size` записей и сообществ в виде для шаблона."""
+    top_posts = sorted(state['posts'].items(), key=lambda item: -item[1])
+    top_groups = sorted(state['groups'].items(), key=lambda item: -item[1])
+    post_scores = dict(top_posts[:size])
+    group_scores = dict(top_groups[:size])
+    posts = [
+        {'id': post_id, 'username': username, 'preview': preview,
+         'score': post_scores[post_id]}
+        for post_id, username, preview in Post.objects.filter(
+            id__in=post_scores,
+        ).values_list('id', 'author__username', 'preview')
+    ]
+    groups = [
+        {'slug': slug, 'title': title, 'score': group_scores[group_id]}
+        for group_id, slug, title in Group.objects.filter(
+            id__in=group_scores,
+        ).values_list('id', 'slug', 'title')
+    ]
+    return {
+        'computed': state['computed'],
+        'posts': sorted(posts, key=lambda post: -post['score']),
+        'groups': sorted(groups, key=lambda group: -group['score']),
+    }
+
+
+def refresh(now=None):
+    """Обновляет рейтинг в кеше, возвращает его."""
+    now = now or timezone.now()
+    state = cache.get(STATE_KEY) or new_state(now)
+    state = update(state, now)
+    result = ranking(state, settings.TRENDING_SIZE)
+    cache.set(STATE_KEY, state, None)
+    cache.set(RANKING_KEY, result, None)
+    return result
+
+
+def current():
+    return cache.get(RANKING_KEY)
@@ -11,11 +11,28 @@ urlpatterns = [
         name='index',
     ),
     # Сообщества
+    path(
+        'groups/',
+        views.group_index,
+        name='groups',
+    ),
     path(
         'group/<slug:slug>/',
         views.group_posts,
         name='group',
     ),
+    # Записи с тегом
+    path(
+        'tag/<str:name>/',
+        views.tag_posts,
+        name='tag',
+    ),
+    # Популярное
+    path(
+        'trending/',
+        views.trending_view,
+        name='trending',
+    ),
     # Новая запись
     path(
         'new/',
@@ -34,6 +51,12 @@ urlpatterns = [
         views.profile,
         name='profile',
     ),
+    # Записи, где упомянут пользователь
+    path(
+        '<str:username>/mentions/',
+        views.mentions,
+        name='mentions',
+    ),
     # Просмотр записи
     path(
         '<str:username>/<int:post_id>/',
@@ -52,6 +75,17 @@ urlpatterns = [
         views.add_comment,
         name='add_comment',
     ),
+    # Лайк и его отмена
+    path(
+        '<str:username>/<int:post_id>/like/',
+        views.post_like,
+        name='post_like',
+    ),
+    path(
+        '<str:username>/<int:post_id>/unlike/',
+        views.post_unlike,
+        name='post_unlike',
+    ),
     # Подписаться
     path(
         '<str:username>/follow/',
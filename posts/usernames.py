@@ -0,0 +1,61 @@
+"""Проверка существования пользователя без запроса к БД.
+
+Маршрут `<str:username>/` ловит любой путь, и боты (`/wp-login.php/`,
+`/favicon.ico/`) иначе каждый раз ищут пользователя в базе. Процесс
+держит в памяти отсортированный кортеж имён и ищет в нём bisect'ом.
+
+Создание, удаление и смена имени пользователя увеличивают поколение
+GENERATION, и каждый процесс при следующей проверке загружает список
+заново одним запросом.
+"""
+from bisect import bisect_left
+from functools import wraps
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.http import Http404
+
+from yatube import generations
+
+
+User = get_user_model()
+
+GENERATION = 'usernames'
+
+# (поколение, отсортированные имена)
+_state = (None, ())
+
+
+def names():
+    global _state
+    current = generations.get(GENERATION)[0]
+    if _state[0] != current:
+        _state = (current, tuple(sorted(
+            User.objects.values_list('username', flat=True).iterator()
+        )))
+    return _state[1]
+
+
+def exists(username):
+    known = names()
+    position = bisect_left(known, username)
+    return position < len(known) and known[position] == username
+
+
+def changed():
+    """Поколение увеличивается сразу и ещё раз после коммита:
+    процесс, загрузивший список до коммита, иначе не увидел бы
+    нового пользователя.
+    """
+    generations.bump(GENERATION)
+    transaction.on_commit(lambda: generations.bump(GENERATION))
+
+
+def known_username(view):
+    """404 без обращения к БД, если пользователя `username` нет."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not exists(kwargs['username']):
+            raise Http404
+        return view(request, *args, **kwargs)
+    return wrapper
@@ -0,0 +1,95 @@
+"""Счётчики просмотров записей с отложенной записью в БД.
+
+Просмотр увеличивает счётчик в памяти процесса, а не пишет в SQLite:
+запись на каждый запрос выстраивала бы воркеры в очередь за блокировкой
+базы. Накопленное сбрасывается не чаще раза в VIEW_COUNTS_FLUSH_INTERVAL
+секунд (на очередном просмотре) и при завершении процесса, если
+включён VIEW_COUNTS_FLUSH_ON_EXIT, — пачкой UPDATE в одной транзакции,
+по одному UPDATE на каждое различное приращение.
+"""
+import atexit
+import threading
+import time
+from collections import Counter, defaultdict
+from functools import wraps
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+
+from yatube import generations
+from . import details
+from .models import Post
+
+
+_lock = threading.Lock()
+_pending = Counter()
+_last_flush = time.monotonic()
+
+
+def count(post_id):
+    with _lock:
+        _pending[post_id] += 1
+        due = (time.monotonic() - _last_flush
+               >= settings.VIEW_COUNTS_FLUSH_INTERVAL)
+    if due:
+        flush()
+
+
+def pending(post_id):
+    """Просмотры записи, ещё не записанные в БД."""
+    with _lock:
+        return _pending[post_id]
+
+
+def flush():
+    """Записывает накопленные просмотры, возвращает число записей."""
+    global _last_flush
+    with _lock:
+        counts = dict(_pending)
+        _pending.clear()
+        _last_flush = time.monotonic()
+    if not counts:
+        return 0
+    by_increment = defaultdict(list)
+    for post_id, views in counts.items():
+        by_increment[views].append(post_id)
+    try:
+        with transaction.atomic():
+            for views, post_ids in by_increment.items():
+                # update() не шлёт сигналов: кеш страниц не сбрасывается.
+                Post.objects.filter(id__in=post_ids).update(
+                    views=F('views') + views,
+                )
+    except Exception:
+        # Транзакция откатилась: возвращаем просмотры до следующего раза.
+        with _lock:
+            _pending.update(counts)
+        raise
+    # Закешированная страница записи показывает просмотры из БД плюс
+    # pending(): после сброса их надо перечитать.
+    generations.bump(*map(details.generation, counts))
+    return len(counts)
+
+
+def reset():
+    """Забывает накопленные просмотры, не записывая их."""
+    with _lock:
+        _pending.clear()
+
+
+@atexit.register
+def flush_on_exit():
+    if settings.VIEW_COUNTS_FLUSH_ON_EXIT:
+        flush()
+
+
+def counts_views(view):
+    """Считает успешные просмотры записи, в том числе из кеша страниц."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        response = view(request, *args, **kwargs)
+        if request.method == 'GET' and response.status_code == 200:
+            count(kwargs['post_id'])
+        return response
+    return wrapper
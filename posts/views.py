@@ -1,37 +1,139 @@
+import time
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
+from django.http import Http404, HttpResponseNotFound
 from django.shortcuts import get_object_or_404, redirect, render
+from django.template.loader import render_to_string
+from django.utils.html import escape
+from yatube import generations, stampede
+from yatube.pagecache import cache_anonymous_page
 from .forms import CommentForm, PostForm
-from .models import Follow, Group, Post
+from . import (
+    authors, details, groupcache, likes, suggestions, trending, usernames,
+    viewcounts,
+)
+from .models import Follow, Group, GroupStats, Post, Tag
+from .readmodels import PostCards, keyset_page
+from .signals import feed_generation
 
 
 User = get_user_model()
 
 
+def counted_page(object_list, per_page, number, count):
+    """Paginator и страница `number` с заранее известным числом строк.
+
+    Счётчик из сводки может разойтись с таблицей, тогда последняя
+    страница теряла бы записи или оказывалась пустой. Строки страницы
+    выбираются с одной лишней; если их число не сходится с `count`,
+    страница строится заново по настоящему COUNT.
+    """
+    paginator = Paginator(object_list, per_page)
+    paginator.count = count
+    page = paginator.get_page(number)
+    bottom = (page.number - 1) * per_page
+    rows = list(object_list[bottom:bottom + per_page + 1])
+    expected = per_page + 1 if page.has_next() else count - bottom
+    if len(rows) == expected:
+        page.object_list = rows[:per_page]
+        return paginator, page
+    paginator = Paginator(object_list, per_page)
+    return paginator, paginator.get_page(number)
+
+
+@cache_anonymous_page
 def index(request):
-    post_list = Post.objects.all()
-    paginator = Paginator(post_list, 10)
+    paginator = Paginator(PostCards(Post.objects.all()), 10)
+    # COUNT по ленте с аннотацией — подзапрос с JOIN; считаем по таблице
+    # записей и только при изменении записей.
+    paginator.count = stampede.get_or_set(
+        'index_count',
+        Post.objects.count,
+        settings.FEED_CACHE_TIMEOUT,
+        generations.get('posts'),
+    )
     page_number = request.GET.get('page')
     page = paginator.get_page(page_number)
+    return render(request, 'index.html', {
+        'page': page,
+        'paginator': paginator,
+        'feed_generation': feed_generation(request.user),
+        'feed_cache_timeout': settings.FEED_CACHE_TIMEOUT,
+    })
+
+
+@cache_anonymous_page
+def group_index(request):
+    # Статистику ведёт posts.groupstats, здесь только чтение.
+    groups = Group.objects.select_related('stats').order_by('title')
+    paginator = Paginator(groups, 50)
+    page = paginator.get_page(request.GET.get('page'))
     return render(
         request,
-        'index.html',
+        'groups.html',
         {'page': page, 'paginator': paginator}
     )
 
 
+@cache_anonymous_page
 def group_posts(request, slug):
-    group = get_object_or_404(Group, slug=slug)
-    post_list = group.posts.all()
-    paginator = Paginator(post_list, 10)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
-    return render(
-        request,
-        'group.html',
-        {'group': group, 'page': page, 'paginator': paginator}
+    group = groupcache.get_by_slug(slug)
+    if group is None:
+        raise Http404
+    # Статистика меняется с каждой записью, в кеш сообществ её не кладём.
+    stats = GroupStats.objects.filter(group_id=group.id).first()
+    paginator, page = counted_page(
+        PostCards(Post.objects.filter(group_id=group.id)), 10,
+        request.GET.get('page'), stats.post_count if stats else 0,
+    )
+    return render(request, 'group.html', {
+        'group': group,
+        'stats': stats,
+        'page': page,
+        'paginator': paginator,
+    })
+
+
+def keyset_before(request):
+    try:
+        return int(request.GET['before'])
+    except (KeyError, ValueError):
+        return None
+
+
+@cache_anonymous_page
+def tag_posts(request, name):
+    tag = get_object_or_404(Tag, name=name.lower())
+    page, next_before = keyset_page(
+        tag.posts.all(), keyset_before(request), 10,
     )
+    return render(request, 'tag.html', {
+        'tag': tag,
+        'page': page,
+        'next_before': next_before,
+    })
+
+
+@usernames.known_username
+@cache_anonymous_page
+def mentions(request, username):
+    author = get_object_or_404(User, username=username)
+    page, next_before = keyset_page(
+        author.mentioned_in.all(), keyset_before(request), 10,
+    )
+    return render(request, 'mentions.html', {
+        'author': author,
+        'page': page,
+        'next_before': next_before,
+    })
+
+
+def trending_view(request):
+    # Рейтинг считает команда update_trending, здесь только чтение кеша.
+    return render(request, 'trending.html', {'ranking': trending.current()})
 
 
 @login_required
@@ -45,47 +147,80 @@ def new_post(request):
     return redirect('index')
 
 
+@usernames.known_username
+@cache_anonymous_page
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    is_following = False
-    if request.user.is_authenticated:
-        is_following = Follow.objects.filter(user=request.user, author=author)
-    followers = Follow.objects.filter(author=author)
-    followings = Follow.objects.filter(user=author)
-    posts = author.posts.all()
-    paginator = Paginator(posts, 5)
-    page = paginator.get_page(request.GET.get('page'))
+    summary = authors.summary(username)
+    if summary is None:
+        raise Http404
+    author = authors.as_user(summary)
+    is_following = (
+        request.user.is_authenticated
+        and Follow.objects.filter(user=request.user, author=author).exists()
+    )
+    # Число записей уже есть в сводке, COUNT не нужен.
+    paginator, page = counted_page(
+        PostCards(Post.objects.filter(author=author)), 5,
+        request.GET.get('page'), summary['post_count'],
+    )
     return render(request, 'profile.html', {
         'author': author,
-        'posts': posts,
         'paginator': paginator,
         'page': page,
         'is_following': is_following,
-        'followers': followers,
-        'followings': followings,
+        'follower_count': summary['follower_count'],
+        'following_count': summary['following_count'],
+        'suggestions': suggestions.for_user(
+            request.user, settings.SUGGESTIONS_SHOWN,
+        ),
     })
 
 
+@usernames.known_username
+@viewcounts.counts_views
+# Сводка автора (записи, подписчики) на странице записи меняется
+# вместе с поколением автора, а не с путём страницы.
+@cache_anonymous_page(depends_on=lambda username, **kwargs: [
+    authors.generation(username),
+])
 def post_view(request, username, post_id):
-    author = get_object_or_404(User, username=username)
-    post = get_object_or_404(Post, pk=post_id, author=author)
-    posts_count = author.posts.all().count()
-    items = post.comments.all()
-    form = CommentForm()
+    summary = authors.summary(username)
+    cached = details.detail(post_id)
+    if (summary is None or cached is None
+            or cached['post'].author_id != summary['id']):
+        raise Http404
+    post = cached['post']
+    post.views += viewcounts.pending(post.id)
+    likes.attach([post], request.user)
+    paginator = Paginator(
+        details.comments(post.id), settings.POST_COMMENTS_PAGE,
+    )
+    paginator.count = post.comment_count
+    comments = paginator.get_page(request.GET.get('page'))
+    if comments.number == 1:
+        # Первая страница комментариев уже в кеше.
+        details.prefill(comments.object_list, cached['comments'])
     return render(request, 'post.html', {
-        'author': author,
+        'author': authors.as_user(summary),
         'post': post,
-        'posts_count': posts_count,
-        'form': form,
-        'items': items,
+        'posts_count': summary['post_count'],
+        'follower_count': summary['follower_count'],
+        'following_count': summary['following_count'],
+        'form': CommentForm(),
+        'items': comments.object_list,
+        'comments': comments,
     })
 
 
 @login_required
 def post_edit(request, username, post_id):
     author = get_object_or_404(User, username=username)
-    post = get_object_or_404(Post, pk=post_id, author=author)
-    if not post.author == request.user:
+    post = get_object_or_404(
+        Post.objects.select_related('author', 'group'),
+        pk=post_id,
+        author=author,
+    )
+    if not author == request.user:
         return redirect('post', username=username, post_id=post.id)
     form = PostForm(
         request.POST or None,
@@ -106,8 +241,12 @@ def post_edit(request, username, post_id):
 @login_required
 def add_comment(request, username, post_id):
     author = get_object_or_404(User, username=username)
-    post = get_object_or_404(Post, pk=post_id, author=author)
-    items = post.comments.all()
+    post = get_object_or_404(
+        Post.objects.select_related('author', 'group'),
+        pk=post_id,
+        author=author,
+    )
+    items = post.comments.select_related('author')
     form = CommentForm(request.POST or None)
     if not form.is_valid():
         return render(
@@ -122,43 +261,82 @@ def add_comment(request, username, post_id):
     return redirect('post', username=username, post_id=post.id)
 
 
+@login_required
+def post_like(request, username, post_id):
+    post = get_object_or_404(Post, pk=post_id, author__username=username)
+    likes.like(request.user, post)
+    return redirect('post', username=username, post_id=post_id)
+
+
+@login_required
+def post_unlike(request, username, post_id):
+    post = get_object_or_404(Post, pk=post_id, author__username=username)
+    likes.unlike(request.user, post)
+    return redirect('post', username=username, post_id=post_id)
+
+
 @login_required
 def follow_index(request):
-    posts = Post.objects.filter(author__following__user=request.user)
+    posts = PostCards(
+        Post.objects.filter(author__following__user=request.user)
+    )
     paginator = Paginator(posts, 10)
     page_number = request.GET.get('page')
     page = paginator.get_page(page_number)
-    return render(
-        request,
-        'follow.html',
-        {'page': page, 'paginator': paginator}
-    )
+    return render(request, 'follow.html', {
+        'page': page,
+        'paginator': paginator,
+        'suggestions': suggestions.for_user(
+            request.user, settings.SUGGESTIONS_SHOWN,
+        ),
+    })
 
 
 @login_required
 def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
-    is_exist = Follow.objects.filter(author=author, user=request.user).exists()
-    if author != request.user and not is_exist:
-        Follow.objects.create(author=author, user=request.user)
+    if author != request.user:
+        Follow.objects.get_or_create(author=author, user=request.user)
     return redirect('profile', username=username)
 
 
 @login_required
 def profile_unfollow(request, username):
     author = get_object_or_404(User, username=username)
-    unfollow = get_object_or_404(Follow, author=author, user=request.user)
+    unfollow = get_object_or_404(
+        Follow.objects.select_related('author', 'user'),
+        author=author,
+        user=request.user,
+    )
     unfollow.delete()
     return redirect('profile', username=username)
 
 
+# Страница 404 для анонимов рендерится раз в NOT_FOUND_CACHE_TIMEOUT
+# секунд с меткой вместо пути: (истекает, части страницы между метками).
+NOT_FOUND_PATH = 'NOT-FOUND-PATH'
+_not_found = (0, ())
+
+
 def page_not_found(request, exception):
-    return render(
-        request,
-        "misc/404.html",
-        {"path": request.path},
-        status=404
-    )
+    global _not_found
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return render(
+            request,
+            "misc/404.html",
+            {"path": request.path},
+            status=404
+        )
+    if _not_found[0] < time.monotonic():
+        html = render_to_string(
+            "misc/404.html", {"path": NOT_FOUND_PATH}, request,
+        )
+        _not_found = (
+            time.monotonic() + settings.NOT_FOUND_CACHE_TIMEOUT,
+            html.split(NOT_FOUND_PATH),
+        )
+    return HttpResponseNotFound(escape(request.path).join(_not_found[1]))
 
 
 def server_error(request):
@@ -0,0 +1,77 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+from yatube import generations
+
+
+User = get_user_model()
+
+# Поля пользователя в кеше. Хеш пароля в общий кеш не попадает:
+# для проверки сессии хватает session_auth_hash.
+FIELDS = (
+    'id', 'username', 'first_name', 'last_name', 'email', 'is_active',
+    'is_staff', 'is_superuser', 'last_login', 'date_joined',
+)
+
+
+def user_generation(user_id):
+    return f'user:{user_id}'
+
+
+def user_cache_key(user_id):
+    return generations.key(f'auth_user:{user_id}', user_generation(user_id))
+
+
+def as_user(cached):
+    """User из закешированного словаря.
+
+    Пароль и прочие поля отложены (deferred): save() запишет только
+    загруженные поля, а обращение к паролю прочитает его из БД.
+    Хеш сессии берётся из кеша, пока пароль не загружен и не изменён
+    (set_password при смене пароля), иначе считается по паролю.
+    """
+    # from_db ждёт значения в порядке полей модели.
+    names = [
+        field.attname for field in User._meta.concrete_fields
+        if field.attname in cached
+    ]
+    user = User.from_db(
+        DEFAULT_DB_ALIAS, names, [cached[name] for name in names],
+    )
+    cached_hash = cached['session_auth_hash']
+
+    def get_session_auth_hash():
+        if 'password' in user.__dict__:
+            return User.get_session_auth_hash(user)
+        return cached_hash
+
+    user.get_session_auth_hash = get_session_auth_hash
+    return user
+
+
+class CachedModelBackend(ModelBackend):
+    """ModelBackend, который берёт пользователя сессии из кеша.
+
+    Вместе с users.sessions запрос залогиненного пользователя обходится
+    без обращений к БД. Ключ включает поколение пользователя, которое
+    увеличивается при сохранении и удалении пользователя (смена пароля,
+    правка профиля, обновление last_login при входе) и при выходе,
+    см. users.signals. Так запись устаревает сразу во всех процессах.
+    """
+
+    def get_user(self, user_id):
+        key = user_cache_key(user_id)
+        cached = cache.get(key)
+        if cached is None:
+            user = super().get_user(user_id)
+            if user is None:
+                return None
+            cached = {name: getattr(user, name) for name in FIELDS}
+            cached['session_auth_hash'] = user.get_session_auth_hash()
+            cache.set(key, cached, settings.USER_CACHE_TIMEOUT)
+            return user
+        user = as_user(cached)
+        return user if self.user_can_authenticate(user) else None
@@ -0,0 +1,17 @@
+from django.contrib.sessions.backends import cached_db
+
+
+class SessionStore(cached_db.SessionStore):
+    """cached_db-сессии в общем уровне кеша (TwoTierCache.shared).
+
+    Локальный уровень процесса помнил бы удалённую сессию ещё
+    LOCAL_TIMEOUT секунд; общий уровень один на все процессы, поэтому
+    выход и flush действуют сразу везде, и ключу сессии не нужно
+    своё поколение.
+    """
+
+    cache_key_prefix = 'users.sessions'
+
+    def __init__(self, session_key=None):
+        super().__init__(session_key)
+        self._cache = getattr(self._cache, 'shared', self._cache)
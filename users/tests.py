@@ -1,3 +1,89 @@
-from django.test import TestCase
+from django.contrib.auth import BACKEND_SESSION_KEY, get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.urls import reverse
+from yatube.querytrace import QueryRecorder
+from .backends import user_cache_key
+from .sessions import SessionStore
 
-# Create your tests here.
+
+User = get_user_model()
+
+USERNAME = 'luke'
+PASSWORD = '12345'
+AUTH_TABLES = ('FROM "django_session"', 'FROM "auth_user"')
+
+
+class CachedAuthTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username=USERNAME,
+            password=PASSWORD,
+        )
+        self.client = Client()
+        self.client.force_login(self.user)
+        self.url = reverse('follow_index')
+
+    def auth_queries(self):
+        recorder = QueryRecorder()
+        with connection.execute_wrapper(recorder):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return [
+            q.sql for q in recorder.queries
+            if any(table in q.sql for table in AUTH_TABLES)
+        ]
+
+    def test_no_auth_queries_when_cached(self):
+        self.assertTrue(self.auth_queries())
+        self.assertEqual(self.auth_queries(), [])
+
+    def test_password_change_invalidates_user(self):
+        self.auth_queries()
+        self.user.set_password('new password')
+        self.user.save()
+        self.assertIsNone(cache.get(user_cache_key(self.user.pk)))
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 302)
+
+    def test_logout_invalidates_user(self):
+        self.auth_queries()
+        self.client.get(reverse('logout'))
+        self.assertIsNone(cache.get(user_cache_key(self.user.pk)))
+
+    def test_logout_removes_shared_session(self):
+        session = SessionStore(self.client.session.session_key)
+        self.auth_queries()
+        self.assertIsNotNone(cache.shared.get(session.cache_key))
+        self.client.get(reverse('logout'))
+        self.assertIsNone(cache.shared.get(session.cache_key))
+
+    def test_password_hash_not_cached(self):
+        self.auth_queries()
+        cached = cache.get(user_cache_key(self.user.pk))
+        self.assertNotIn('password', cached)
+        self.assertNotIn(self.user.password, repr(cached))
+        # Пользователь из кеша сохраняется, не затирая пароль.
+        self.client.get(self.url).wsgi_request.user.save()
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.check_password(PASSWORD))
+
+    def test_model_backend_sessions_kept(self):
+        session = self.client.session
+        session[BACKEND_SESSION_KEY] = (
+            'django.contrib.auth.backends.ModelBackend'
+        )
+        session.save()
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+
+    def test_own_password_change_keeps_session(self):
+        self.auth_queries()
+        response = self.client.post(reverse('password_change'), {
+            'old_password': PASSWORD,
+            'new_password1': 'new password 42',
+            'new_password2': 'new password 42',
+        })
+        self.assertRedirects(response, reverse('password_change_done'))
+        self.assertEqual(self.client.get(self.url).status_code, 200)
@@ -0,0 +1,351 @@
+"""Бэкенды кеша: общий для процессов SQLite и двухуровневый поверх него.
+
+    CACHES = {
+        'default': {
+            'BACKEND': 'yatube.cache.TwoTierCache',
+            'LOCATION': '/path/to/cache.sqlite3',
+            'OPTIONS': {
+                'MAX_ENTRIES': 100000,
+                'CULL_EVERY': 100,
+                'LOCAL_MAX_BYTES': 32 * 1024 * 1024,
+                'LOCAL_TIMEOUT': 5,
+                'NEGATIVE_TIMEOUT': 1,
+            },
+        },
+    }
+
+Локальный уровень живёт в памяти процесса и хранит записи не дольше
+LOCAL_TIMEOUT секунд, поэтому удаление ключа в одном процессе доходит
+до остальных с этой задержкой. Ключи с поколениями (yatube.generations)
+устаревают во всех процессах сразу.
+"""
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+from .localdb import LocalSQLite
+
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS cache (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    expires REAL
+);
+CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires);
+'''
+ADD = (
+    'INSERT INTO cache (key, value, expires) VALUES (?, ?, ?) '
+    'ON CONFLICT (key) DO UPDATE SET '
+    'value = excluded.value, expires = excluded.expires '
+    'WHERE cache.expires IS NOT NULL AND cache.expires <= ?'
+)
+ALIVE = '(expires IS NULL OR expires > ?)'
+
+# Признак отсутствующего ключа в локальном уровне (negative caching).
+MISSING = object()
+
+
+class SQLiteCache(BaseCache):
+    """Кеш в файле SQLite, общий для всех процессов на машине.
+
+    `add` атомарен, поэтому подходит для межпроцессных блокировок.
+    Размер проверяется раз в CULL_EVERY записей (COUNT по таблице
+    недёшев); при превышении MAX_ENTRIES удаляется, как в Django,
+    1/CULL_FREQUENCY записей, раньше всех — ближайшие к истечению.
+    """
+
+    store = LocalSQLite(SCHEMA)
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self._path = location
+        self._sets = 0
+        options = params.get('OPTIONS', {})
+        self._cull_every = int(options.get('CULL_EVERY', 100))
+
+    @property
+    def _db(self):
+        return self.store.connection(self._path)
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _get_raw(self, keys):
+        """{ключ: pickle} для живых записей из `keys` одним запросом."""
+        if not keys:
+            return {}
+        placeholders = ', '.join('?' * len(keys))
+        return dict(self._db.execute(
+            f'SELECT key, value FROM cache '
+            f'WHERE key IN ({placeholders}) AND {ALIVE}',
+            [*keys, time.time()],
+        ))
+
+    def get(self, key, default=None, version=None):
+        value = self._get_raw([self._key(key, version)])
+        if not value:
+            return default
+        return pickle.loads(value.popitem()[1])
+
+    def get_many(self, keys, version=None):
+        made = {self._key(key, version): key for key in keys}
+        return {
+            made[key]: pickle.loads(value)
+            for key, value in self._get_raw(list(made)).items()
+        }
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self._set(self._key(key, version), pickle.dumps(value), timeout)
+
+    def _set(self, key, pickled, timeout):
+        self._db.execute(
+            'INSERT OR REPLACE INTO cache (key, value, expires) '
+            'VALUES (?, ?, ?)',
+            (key, pickled, self.get_backend_timeout(timeout)),
+        )
+        self._maybe_cull()
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        cursor = self._db.execute(ADD, (
+            self._key(key, version),
+            pickle.dumps(value),
+            self.get_backend_timeout(timeout),
+            time.time(),
+        ))
+        self._maybe_cull()
+        return cursor.rowcount == 1
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        cursor = self._db.execute(
+            f'UPDATE cache SET expires = ? WHERE key = ? AND {ALIVE}',
+            (self.get_backend_timeout(timeout), self._key(key, version),
+             time.time()),
+        )
+        return cursor.rowcount == 1
+
+    def delete(self, key, version=None):
+        self._db.execute(
+            'DELETE FROM cache WHERE key = ?', (self._key(key, version),),
+        )
+
+    def delete_many(self, keys, version=None):
+        self._db.executemany(
+            'DELETE FROM cache WHERE key = ?',
+            [(self._key(key, version),) for key in keys],
+        )
+
+    def has_key(self, key, version=None):
+        return bool(self._get_raw([self._key(key, version)]))
+
+    def clear(self):
+        self._db.execute('DELETE FROM cache')
+
+    def _maybe_cull(self):
+        """Раз в CULL_EVERY записей чистит истёкшие и лишние ключи."""
+        self._sets += 1
+        if self._sets % self._cull_every:
+            return
+        db = self._db
+        db.execute('DELETE FROM cache WHERE expires <= ?', (time.time(),))
+        count, = db.execute('SELECT COUNT(*) FROM cache').fetchone()
+        if count <= self._max_entries:
+            return
+        if self._cull_frequency == 0:
+            db.execute('DELETE FROM cache')
+            return
+        db.execute(
+            'DELETE FROM cache WHERE key IN ('
+            'SELECT key FROM cache '
+            'ORDER BY expires IS NULL, expires LIMIT ?)',
+            (count // self._cull_frequency,),
+        )
+
+
+class LocalTier:
+    """LRU в памяти процесса: ключ -> (истекает, размер, pickle или MISSING).
+
+    Ограничен суммарным размером ключей и pickle-значений.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.stats = dict.fromkeys((
+            'local_hits', 'negative_hits', 'shared_hits', 'shared_misses',
+            'evictions',
+        ), 0)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                self._pop(key)
+                return None
+            self._entries.move_to_end(key)
+            if entry[2] is MISSING:
+                self.stats['negative_hits'] += 1
+            else:
+                self.stats['local_hits'] += 1
+            return entry[2]
+
+    def set(self, key, pickled, timeout):
+        size = len(key) + (len(pickled) if pickled is not MISSING else 0)
+        with self._lock:
+            self._pop(key)
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (time.monotonic() + timeout, size, pickled)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                self._pop(next(iter(self._entries)))
+                self.stats['evictions'] += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._pop(key)
+
+    def _pop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[1]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def usage(self):
+        with self._lock:
+            return len(self._entries), self._bytes
+
+
+# Локальные уровни по LOCATION: Django создаёт экземпляр бэкенда
+# на каждый поток, а LRU должен быть один на процесс.
+_local_tiers = {}
+_local_tiers_lock = threading.Lock()
+
+
+class TwoTierCache(BaseCache):
+    """Ограниченный по объёму LRU в памяти процесса перед SQLiteCache.
+
+    Промахи общего уровня тоже запоминаются локально на NEGATIVE_TIMEOUT
+    секунд. Счётчики попаданий по уровням отдаёт `stats()`.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.local_timeout = float(options.get('LOCAL_TIMEOUT', 5))
+        self.negative_timeout = float(options.get('NEGATIVE_TIMEOUT', 1))
+        self.shared = SQLiteCache(location, params)
+        with _local_tiers_lock:
+            self.local = _local_tiers.setdefault(location, LocalTier(
+                int(options.get('LOCAL_MAX_BYTES', 16 * 1024 * 1024)),
+            ))
+
+    def _local_timeout(self, timeout):
+        """Локальная запись не переживает общую."""
+        expires = self.get_backend_timeout(timeout)
+        if expires is None:
+            return self.local_timeout
+        return min(self.local_timeout, max(0, expires - time.time()))
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def get(self, key, default=None, version=None):
+        return self.get_many([key], version=version).get(key, default)
+
+    def get_many(self, keys, version=None):
+        result = {}
+        remote = {}
+        for key in keys:
+            made = self._key(key, version)
+            pickled = self.local.get(made)
+            if pickled is None:
+                remote[made] = key
+            elif pickled is not MISSING:
+                result[key] = pickle.loads(pickled)
+        if remote:
+            found = self.shared._get_raw(list(remote))
+            self.local.stats['shared_hits'] += len(found)
+            self.local.stats['shared_misses'] += len(remote) - len(found)
+            for made, key in remote.items():
+                if made in found:
+                    self.local.set(made, found[made], self.local_timeout)
+                    result[key] = pickle.loads(found[made])
+                else:
+                    self.local.set(made, MISSING, self.negative_timeout)
+        return result
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        made = self._key(key, version)
+        pickled = pickle.dumps(value)
+        self.shared._set(made, pickled, timeout)
+        self.local.set(made, pickled, self._local_timeout(timeout))
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self.shared.add(key, value, timeout, version)
+        made = self._key(key, version)
+        if added:
+            self.local.set(
+                made, pickle.dumps(value), self._local_timeout(timeout),
+            )
+        else:
+            self.local.delete(made)
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        self.local.delete(self._key(key, version))
+        return self.shared.touch(key, timeout, version)
+
+    def delete(self, key, version=None):
+        self.local.delete(self._key(key, version))
+        self.shared.delete(key, version)
+
+    def delete_many(self, keys, version=None):
+        for key in keys:
+            self.local.delete(self._key(key, version))
+        self.shared.delete_many(keys, version)
+
+    def has_key(self, key, version=None):
+        return key in self.get_many([key], version=version)
+
+    def incr(self, key, delta=1, version=None):
+        self.local.delete(self._key(key, version))
+        return self.shared.incr(key, delta, version)
+
+    def clear(self):
+        self.local.clear()
+        self.shared.clear()
+
+    def stats(self):
+        """Попадания по уровням в этом процессе и заполненность LRU."""
+        stats = dict(self.local.stats)
+        stats['local_entries'], stats['local_bytes'] = self.local.usage()
+        stats['local_max_bytes'] = self.local.max_bytes
+        lookups = (
+            stats['local_hits'] + stats['negative_hits']
+            + stats['shared_hits'] + stats['shared_misses']
+        )
+        shared_lookups = stats['shared_hits'] + stats['shared_misses']
+        stats['local_hit_rate'] = (
+            (stats['local_hits'] + stats['negative_hits']) / lookups
+            if lookups else 0.0
+        )
+        stats['shared_hit_rate'] = (
+            stats['shared_hits'] / shared_lookups if shared_lookups else 0.0
+        )
+        return stats
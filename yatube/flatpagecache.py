@@ -0,0 +1,83 @@
+"""Простые страницы (django.contrib.flatpages) из памяти процесса.
+
+Замена `django.contrib.flatpages.views.flatpage`: все страницы сайта
+загружаются одним запросом и хранятся в процессе до смены поколения
+'flatpages' (его увеличивают сигналы FlatPage, см. posts.signals).
+Анонимам страница рендерится один раз и отдаётся готовой с ETag,
+на совпавший If-None-Match отвечает 304. Вошедшим пользователям
+страница рендерится на каждый запрос, но без обращения к БД.
+"""
+import hashlib
+
+from django.conf import settings
+from django.contrib.flatpages.models import FlatPage
+from django.contrib.flatpages.views import render_flatpage
+from django.contrib.sites.shortcuts import get_current_site
+from django.db import transaction
+from django.http import Http404, HttpResponse, HttpResponsePermanentRedirect
+from django.utils.cache import get_conditional_response, quote_etag
+
+from . import generations
+from .pagecache import cacheable
+
+
+GENERATION = 'flatpages'
+
+# id сайта -> (поколение, {url: FlatPage}, {url: (HTML, ETag)})
+_sites = {}
+
+
+def invalidate():
+    """Поколение увеличивается сразу и ещё раз после коммита: процесс,
+    загрузивший страницы до коммита, иначе держал бы старую версию.
+    """
+    generations.bump(GENERATION)
+    transaction.on_commit(lambda: generations.bump(GENERATION))
+
+
+def site_state(site_id):
+    current = generations.get(GENERATION)[0]
+    state = _sites.get(site_id)
+    if state is None or state[0] != current:
+        pages = {page.url: page for page in FlatPage.objects.filter(
+            sites=site_id,
+        )}
+        state = _sites[site_id] = (current, pages, {})
+    return state
+
+
+def render_anonymous(request, page, rendered):
+    """Готовая страница для анонимов: (HTML, ETag) или None, если
+    ответ нельзя отдавать всем (например, он ставит cookie).
+    """
+    if page.url not in rendered:
+        response = render_flatpage(request, page)
+        if not cacheable(request, response):
+            return None
+        etag = quote_etag(hashlib.md5(response.content).hexdigest())
+        rendered[page.url] = (response.content, etag)
+    return rendered[page.url]
+
+
+def flatpage(request, url):
+    if not url.startswith('/'):
+        url = '/' + url
+    _, pages, rendered = site_state(get_current_site(request).id)
+    page = pages.get(url)
+    if page is None:
+        if (not url.endswith('/') and settings.APPEND_SLASH
+                and url + '/' in pages):
+            return HttpResponsePermanentRedirect(f'{request.path}/')
+        raise Http404
+    if (request.user.is_authenticated or page.registration_required
+            or request.method not in ('GET', 'HEAD')):
+        return render_flatpage(request, page)
+    ready = render_anonymous(request, page, rendered)
+    if ready is None:
+        return render_flatpage(request, page)
+    content, etag = ready
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(content)
+    response['ETag'] = etag
+    return response
@@ -0,0 +1,85 @@
+"""Счётчики поколений кеша, общие для всех процессов.
+
+Счётчики лежат в отдельном файле SQLite (CACHE_GENERATIONS_DB), поэтому
+их видят все воркеры на машине, а чтение не считается запросом к БД
+проекта. Ключ кеша включает текущие значения нужных счётчиков:
+
+    key = generations.key('index_page', 'posts', 'groups')
+    generations.bump('posts')  # все процессы сразу строят новый ключ
+
+Старые записи никто больше не читает, они истекают сами. Новый счётчик
+начинается с текущего времени в микросекундах, так что даже после
+удаления файла значения не повторяются.
+"""
+import time
+
+from django.conf import settings
+
+from .localdb import LocalSQLite
+
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS generations ('
+    'name TEXT PRIMARY KEY, value INTEGER NOT NULL)'
+)
+INSERT = 'INSERT OR IGNORE INTO generations (name, value) VALUES (?, ?)'
+BUMP = (
+    'INSERT INTO generations (name, value) VALUES (?, ?) '
+    'ON CONFLICT (name) DO UPDATE SET value = value + 1'
+)
+
+store = LocalSQLite(SCHEMA)
+
+
+def connection():
+    return store.connection(settings.CACHE_GENERATIONS_DB)
+
+
+def initial():
+    return int(time.time() * 1000000)
+
+
+def get(*names):
+    """Текущие значения счётчиков в порядке `names`."""
+    db = connection()
+    placeholders = ', '.join('?' * len(names))
+    values = dict(db.execute(
+        f'SELECT name, value FROM generations WHERE name IN ({placeholders})',
+        names,
+    ))
+    missing = [name for name in names if name not in values]
+    if missing:
+        start = initial()
+        db.executemany(INSERT, [(name, start) for name in missing])
+        values.update(db.execute(
+            f'SELECT name, value FROM generations '
+            f'WHERE name IN ({", ".join("?" * len(missing))})',
+            missing,
+        ))
+    return tuple(values[name] for name in names)
+
+
+def peek(*names):
+    """Как get(), но без создания счётчиков: отсутствующий равен 0.
+
+    Для имён из адреса запроса (страницы, id записей), которые иначе
+    оставляли бы по строке на каждый случайный путь. Первый bump()
+    создаёт счётчик со значением initial(), отличным от 0.
+    """
+    placeholders = ', '.join('?' * len(names))
+    values = dict(connection().execute(
+        f'SELECT name, value FROM generations WHERE name IN ({placeholders})',
+        names,
+    ))
+    return tuple(values.get(name, 0) for name in names)
+
+
+def bump(*names):
+    """Увеличивает счётчики, делая недействительными ключи с ними."""
+    start = initial()
+    connection().executemany(BUMP, [(name, start) for name in names])
+
+
+def key(base, *names):
+    """`base` с приписанными поколениями `names`."""
+    return ':'.join([base, *map(str, get(*names))])
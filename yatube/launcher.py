@@ -0,0 +1,31 @@
+"""
+WSGI-модуль с прогревом для серверов с предзагрузкой приложения.
+
+Прогрев (yatube.warmup) выполняется один раз в мастер-процессе до fork,
+после чего куча замораживается: воркеры делят память с мастером
+copy-on-write, а сборщик мусора не трогает унаследованные объекты.
+
+    gunicorn --preload --workers 4 yatube.launcher:application
+    uwsgi --master --processes 4 --module yatube.launcher:application
+
+Без предзагрузки (`lazy-apps`) модуль работает как обычный yatube.wsgi,
+только каждый воркер прогревается сам.
+"""
+
+import gc
+import os
+
+from django.core.wsgi import get_wsgi_application
+from django.db import connections
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+
+application = get_wsgi_application()
+
+from .warmup import warm_up  # noqa: E402
+
+warm_up()
+# Соединения с БД не должны переходить в дочерние процессы.
+connections.close_all()
+gc.collect()
+gc.freeze()
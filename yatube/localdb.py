@@ -0,0 +1,27 @@
+"""Соединения с локальными файлами SQLite для общих между процессами
+структур (счётчики поколений, общий уровень кеша).
+"""
+import os
+import sqlite3
+import threading
+
+
+class LocalSQLite:
+    """Соединение на поток, открываемое заново после fork.
+
+    `schema` — SQL, выполняемый при каждом открытии соединения.
+    """
+
+    def __init__(self, schema):
+        self.schema = schema
+        self._local = threading.local()
+
+    def connection(self, path):
+        state = getattr(self._local, 'state', None)
+        if state is None or state[0] != (os.getpid(), path):
+            db = sqlite3.connect(path, timeout=5, isolation_level=None)
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=NORMAL')
+            db.executescript(self.schema)
+            state = self._local.state = ((os.getpid(), path), db)
+        return state[1]
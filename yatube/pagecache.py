@@ -0,0 +1,92 @@
+"""Кеш целых страниц для анонимных посетителей.
+
+Ответ кешируется по пути и строке запроса. Ключ включает поколение
+пути `page:<путь>`, поэтому все варианты страницы (например, все
+`?page=N` главной) сбрасываются одним вызовом:
+
+    pagecache.invalidate('/', '/luke/')
+
+Какие пути затрагивает изменение модели, решают сигналы приложения,
+см. posts.signals. Страницы, которые зависят от данных, общих для
+многих путей (например, сводки автора на страницах всех его записей),
+добавляют в ключ поколения этих данных через `depends_on`.
+"""
+import hashlib
+from functools import wraps
+from urllib.parse import unquote
+
+from django.conf import settings
+from django.core.cache import cache
+
+from . import generations, stampede
+
+
+def page_generation(path):
+    return f'page:{path}'
+
+
+def page_key(request, names=()):
+    query = hashlib.md5(request.GET.urlencode().encode()).hexdigest()
+    # peek: поколения создаются только при инвалидации существующих
+    # страниц, а не на каждый путь, по которому пришёл бот.
+    current = generations.peek(page_generation(request.path), *names)
+    return ':'.join([f'page:{request.path}:{query}', *map(str, current)])
+
+
+def invalidate(*paths):
+    """Сбрасывает закешированные страницы `paths` во всех процессах.
+
+    Пути приходят из reverse() с %-кодированием не-ASCII символов,
+    а ключ строится по уже раскодированному request.path.
+    """
+    if paths:
+        generations.bump(*{page_generation(unquote(path)) for path in paths})
+
+
+def cacheable(request, response):
+    return (
+        response.status_code == 200
+        and not response.streaming
+        and not response.cookies
+        and not request.META.get('CSRF_COOKIE_USED')
+    )
+
+
+def cache_anonymous_page(view=None, depends_on=None):
+    """Отдаёт анонимным GET/HEAD-запросам готовый ответ из кеша.
+
+    `depends_on(**kwargs)` возвращает дополнительные поколения ключа
+    по аргументам представления:
+
+        @cache_anonymous_page(depends_on=lambda username, **kwargs: [
+            authors.generation(username),
+        ])
+
+    Заголовок `X-Page-Cache` показывает, был ли ответ закеширован.
+    Ответ, собранный из устаревших значений stampede, не кешируется:
+    иначе он пережил бы их пересчёт.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if (request.method not in ('GET', 'HEAD')
+                    or request.user.is_authenticated):
+                return view(request, *args, **kwargs)
+            names = depends_on(**kwargs) if depends_on else ()
+            key = page_key(request, names)
+            response = cache.get(key)
+            if response is not None:
+                response['X-Page-Cache'] = 'hit'
+                return response
+            stampede.track_stale()
+            response = view(request, *args, **kwargs)
+            if hasattr(response, 'render') and callable(response.render):
+                response = response.render()
+            if cacheable(request, response) and not stampede.served_stale():
+                cache.set(key, response, settings.PAGE_CACHE_TIMEOUT)
+                response['X-Page-Cache'] = 'miss'
+            return response
+        return wrapper
+    if view is not None:
+        return decorator(view)
+    return decorator
@@ -0,0 +1,118 @@
+"""Профилирование отдельных запросов через cProfile.
+
+Профиль снимается, если сотрудник передал заголовок `X-Profile`
+или параметр `?profile`, либо запрос попал в случайную выборку
+с долей PROFILING_SAMPLE_RATE. Дампы пишутся в PROFILING_DIR,
+хранятся последние PROFILING_MAX_DUMPS штук.
+"""
+import cProfile
+import os
+import pstats
+import random
+import re
+import time
+import uuid
+
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.core.cache import cache
+from django.shortcuts import render
+
+from . import slowlog
+
+
+DUMP_SUFFIX = '.prof'
+TOP_FUNCTIONS = 15
+
+
+def should_profile(request):
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_staff and (
+            settings.PROFILING_HEADER in request.META
+            or settings.PROFILING_QUERY_FLAG in request.GET):
+        return True
+    return random.random() < settings.PROFILING_SAMPLE_RATE
+
+
+def dump_name(request):
+    path = re.sub(r'[^\w-]+', '_', request.path).strip('_') or 'index'
+    stamp = time.strftime('%Y%m%d-%H%M%S')
+    return f'{stamp}-{uuid.uuid4().hex[:6]}-{path[:80]}'
+
+
+def rotate(directory, keep):
+    """Удаляет самые старые дампы сверх `keep` штук."""
+    dumps = sorted(
+        (entry for entry in os.scandir(directory)
+         if entry.name.endswith(DUMP_SUFFIX)),
+        key=lambda entry: entry.stat().st_mtime,
+    )
+    for entry in dumps[:max(0, len(dumps) - keep)]:
+        try:
+            os.remove(entry.path)
+        except FileNotFoundError:
+            pass
+
+
+class ProfilingMiddleware:
+    """Снимает профиль представления вместе с рендерингом шаблонов.
+
+    Должен стоять после AuthenticationMiddleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not should_profile(request):
+            return self.get_response(request)
+        profiler = cProfile.Profile()
+        response = profiler.runcall(self.get_response, request)
+        directory = settings.PROFILING_DIR
+        os.makedirs(directory, exist_ok=True)
+        name = dump_name(request) + DUMP_SUFFIX
+        profiler.dump_stats(os.path.join(directory, name))
+        rotate(directory, settings.PROFILING_MAX_DUMPS)
+        response['X-Profile-Dump'] = name
+        return response
+
+
+def describe(path):
+    """Краткая сводка дампа: общее время и самые тяжёлые функции."""
+    stats = pstats.Stats(path)
+    stats.sort_stats('cumulative')
+    top = []
+    for func in stats.fcn_list[:TOP_FUNCTIONS]:
+        calls, ncalls, tottime, cumtime, callers = stats.stats[func]
+        top.append({
+            'name': pstats.func_std_string(func),
+            'ncalls': ncalls,
+            'tottime': tottime * 1000,
+            'cumtime': cumtime * 1000,
+        })
+    return {'total': stats.total_tt * 1000, 'top': top}
+
+
+@staff_member_required
+def dumps(request):
+    directory = settings.PROFILING_DIR
+    entries = []
+    if os.path.isdir(directory):
+        entries = sorted(
+            (entry for entry in os.scandir(directory)
+             if entry.name.endswith(DUMP_SUFFIX)),
+            key=lambda entry: entry.stat().st_mtime,
+            reverse=True,
+        )
+    profiles = []
+    for entry in entries:
+        try:
+            summary = describe(entry.path)
+        except (EOFError, ValueError, TypeError):
+            continue
+        profiles.append({'name': entry.name, **summary})
+    return render(request, 'misc/profiles.html', {
+        'profiles': profiles,
+        'slow_queries': reversed(slowlog.recent),
+        'cache_stats': cache.stats() if hasattr(cache, 'stats') else None,
+    })
@@ -0,0 +1,75 @@
+"""Учёт SQL-запросов с привязкой к месту в шаблоне, откуда они вызваны."""
+import inspect
+import time
+from collections import Counter, namedtuple
+
+from django.template.base import Node
+
+
+RecordedQuery = namedtuple(
+    'RecordedQuery',
+    ('sql', 'params', 'position', 'duration'),
+)
+
+
+def template_position():
+    """Возвращает `шаблон:строка` узла шаблона, который сейчас рендерится.
+
+    Ищет по стеку ближайший вызов `Node.render_annotated`, поэтому
+    для `{{ post.author }}` внутри `post_item.html` вернётся строка
+    именно с этой переменной, а не с `{% include %}` в ленте.
+    Вне рендеринга шаблона возвращает None.
+    """
+    frame = inspect.currentframe()
+    try:
+        while frame is not None:
+            node = frame.f_locals.get('self')
+            if (frame.f_code.co_name == 'render_annotated'
+                    and isinstance(node, Node)):
+                origin = getattr(node, 'origin', None)
+                token = getattr(node, 'token', None)
+                if origin is not None and token is not None:
+                    return f'{origin.template_name}:{token.lineno}'
+            frame = frame.f_back
+    finally:
+        del frame
+    return None
+
+
+class QueryRecorder:
+    """Обёртка для `connection.execute_wrapper`, запоминающая запросы.
+
+        recorder = QueryRecorder()
+        with connection.execute_wrapper(recorder):
+            client.get('/')
+        print(recorder.report())
+    """
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        position = template_position()
+        start = time.monotonic()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append(RecordedQuery(
+                sql, params, position, time.monotonic() - start,
+            ))
+
+    def __len__(self):
+        return len(self.queries)
+
+    def by_position(self):
+        """Счётчик запросов по месту в шаблоне (`view` — вне шаблонов)."""
+        return Counter(q.position or 'view' for q in self.queries)
+
+    def at(self, position):
+        """Запросы, выполненные из указанного места."""
+        return [q for q in self.queries if (q.position or 'view') == position]
+
+    def report(self):
+        return '\n'.join(
+            f'  [{q.position or "view"}] {q.sql}' for q in self.queries
+        )
@@ -10,11 +10,25 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/2.2/ref/settings/
 """
 
+import atexit
 import os
+import shutil
+import sys
+import tempfile
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
+# Тесты (manage.py test, pytest) держат кеш, поколения и журнал
+# медленных запросов во временном каталоге: cache.clear() в тестах
+# иначе сбрасывал бы кеш запущенного сервера, а тесты видели бы его записи.
+TESTING = sys.argv[1:2] == ['test'] or 'pytest' in sys.modules
+if TESTING:
+    RUNTIME_DIR = tempfile.mkdtemp(prefix='yatube-test-')
+    atexit.register(shutil.rmtree, RUNTIME_DIR, True)
+else:
+    RUNTIME_DIR = BASE_DIR
+
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/2.2/howto/deployment/checklist/
@@ -36,8 +50,8 @@ ALLOWED_HOSTS = [
 # Application definition
 
 INSTALLED_APPS = [
-    'users',
-    'posts',
+    'users.apps.UsersConfig',
+    'posts.apps.PostsConfig',
     'django.contrib.sites',
     'django.contrib.flatpages',
     'django.contrib.admin',
@@ -51,23 +65,34 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'yatube.slowlog.SlowQueryMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'yatube.profiling.ProfilingMiddleware',
 ]
 
 ROOT_URLCONF = 'yatube.urls'
 
 TEMPLATES_DIR = os.path.join(BASE_DIR, "templates")
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+if not DEBUG:
+    # В продакшене шаблоны компилируются один раз на процесс.
+    TEMPLATE_LOADERS = [
+        ('django.template.loaders.cached.Loader', TEMPLATE_LOADERS),
+    ]
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
-        'APP_DIRS': True,
         'OPTIONS': {
+            'loaders': TEMPLATE_LOADERS,
             'context_processors': [
                 'yatube.context_processors.year',
                 'django.template.context_processors.debug',
@@ -136,8 +161,47 @@ MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 
+# Сколько символов текста записи выводится в лентах (Post.preview).
+POST_PREVIEW_LENGTH = 500
+# Как часто счётчики просмотров из памяти записываются в БД, секунд
+# (posts.viewcounts).
+VIEW_COUNTS_FLUSH_INTERVAL = 10
+# Записывать накопленные просмотры при завершении процесса. В тестах
+# к этому моменту тестовая база уже удалена.
+VIEW_COUNTS_FLUSH_ON_EXIT = not TESTING
+# Счётчик лайков записи делится на столько строк (posts.likes),
+# сумма кешируется на LIKE_COUNT_TIMEOUT секунд.
+LIKE_COUNTER_SHARDS = 8
+LIKE_COUNT_TIMEOUT = 60
+# Рейтинг популярного (posts.trending): период полураспада вклада
+# события и окно для расчёта с нуля, секунд; сколько позиций выводить
+# и сколько хранить в состоянии.
+TRENDING_HALF_LIFE = 6 * 60 * 60
+TRENDING_WINDOW = 3 * 24 * 60 * 60
+TRENDING_SIZE = 20
+TRENDING_KEEP = 1000
+# Рекомендации подписок (posts.suggestions): сколько хранить на
+# пользователя, вес «друга друга», сколько подписчиков автора брать
+# в кандидаты на похожих читателей, сколько выводить на странице.
+SUGGESTIONS_SIZE = 20
+SUGGESTIONS_FOF_WEIGHT = 1.0
+SUGGESTIONS_MAX_READERS = 200
+SUGGESTIONS_SHOWN = 5
+
+
 # Login
 
+# Пользователь сессии берётся из кеша, см. users.backends.
+# ModelBackend остаётся для сессий, созданных до кеширования: в них
+# записан его путь.
+AUTHENTICATION_BACKENDS = [
+    'users.backends.CachedModelBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+USER_CACHE_TIMEOUT = 300
+# Сессии читаются из кеша, записываются и в кеш, и в БД.
+SESSION_ENGINE = 'users.sessions'
+
 LOGIN_URL = "/auth/login/"
 LOGIN_REDIRECT_URL = "index"
 # LOGOUT_REDIRECT_URL = "index"
@@ -153,8 +217,97 @@ EMAIL_FILE_PATH = os.path.join(BASE_DIR, "sent_emails")
 SITE_ID = 1
 
 
+# LRU в памяти процесса перед общим для всех процессов кешем в SQLite,
+# см. yatube.cache.
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'yatube.cache.TwoTierCache',
+        'LOCATION': os.path.join(RUNTIME_DIR, 'cache.sqlite3'),
+        'OPTIONS': {
+            'MAX_ENTRIES': 100000,
+            # Проверять размер раз в столько записей (yatube.cache).
+            'CULL_EVERY': 100,
+            'LOCAL_MAX_BYTES': 32 * 1024 * 1024,
+            'LOCAL_TIMEOUT': 5,
+            'NEGATIVE_TIMEOUT': 1,
+        },
     }
 }
+# Общие для всех процессов счётчики поколений кеша (yatube.generations).
+CACHE_GENERATIONS_DB = os.path.join(
+    RUNTIME_DIR, 'cache_generations.sqlite3',
+)
+# Сколько живёт закешированная лента главной страницы. Устаревшие записи
+# не читаются благодаря поколениям, так что время можно держать большим.
+FEED_CACHE_TIMEOUT = 300
+# Сколько живут страницы для анонимных посетителей (yatube.pagecache).
+# Сигналы сбрасывают затронутые страницы сразу.
+PAGE_CACHE_TIMEOUT = 300
+# Сводка автора для профиля (posts.authors), секунд.
+AUTHOR_SUMMARY_TIMEOUT = 300
+# Страница записи (posts.details): время жизни в кеше, секунд,
+# и число комментариев на странице.
+POST_DETAIL_TIMEOUT = 300
+POST_COMMENTS_PAGE = 50
+# Заранее отрендеренная страница 404 для анонимов, секунд.
+NOT_FOUND_CACHE_TIMEOUT = 3600
+# Защита от лавины пересчётов (yatube.stampede): коэффициент раннего
+# пересчёта, сколько отдавать устаревшее значение, время жизни блокировки
+# и сколько ждать чужого пересчёта, если отдать нечего.
+STAMPEDE_BETA = 1.0
+STAMPEDE_STALE_TIMEOUT = 60
+STAMPEDE_LOCK_TIMEOUT = 30
+STAMPEDE_WAIT = 5
+STAMPEDE_POLL_INTERVAL = 0.05
+
+
+# Профилирование запросов (yatube.profiling)
+# Каталог с дампами cProfile и сколько последних дампов хранить.
+PROFILING_DIR = os.path.join(BASE_DIR, 'profiles')
+PROFILING_MAX_DUMPS = 50
+# Сотрудник включает профилирование заголовком X-Profile или ?profile.
+PROFILING_HEADER = 'HTTP_X_PROFILE'
+PROFILING_QUERY_FLAG = 'profile'
+# Доля случайных запросов, которые профилируются всегда (0 — выключено).
+PROFILING_SAMPLE_RATE = 0.0
+
+
+# Журнал медленных SQL-запросов (yatube.slowlog)
+# Порог в секундах и размер кольцевого буфера последних медленных запросов.
+SLOW_QUERY_THRESHOLD = 0.05
+SLOW_QUERY_BUFFER = 200
+# Полный просмотр этих таблиц в плане запроса выделяется в логе.
+SLOW_QUERY_WATCHED_TABLES = ('posts_post', 'posts_comment', 'posts_follow')
+SLOW_QUERY_LOG = os.path.join(RUNTIME_DIR, 'slow_queries.log')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'timestamped': {
+            'format': '{asctime} {levelname} {message}',
+            'style': '{',
+        },
+    },
+    'handlers': {
+        'slow_queries': {
+            'class': 'logging.FileHandler',
+            'filename': SLOW_QUERY_LOG,
+            'formatter': 'timestamped',
+            'delay': True,
+        },
+    },
+    'loggers': {
+        'yatube.slowlog': {
+            'handlers': ['slow_queries'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
+
+
+# Прогрев процесса (yatube.warmup): сколько страниц главной
+# и лент самых активных сообществ отрендерить заранее.
+WARMUP_INDEX_PAGES = 3
+WARMUP_GROUPS = 5
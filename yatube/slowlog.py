@@ -0,0 +1,108 @@
+"""Журнал медленных SQL-запросов.
+
+Запросы дольше SLOW_QUERY_THRESHOLD секунд попадают в кольцевой буфер
+`recent` (последние SLOW_QUERY_BUFFER штук) и в логгер `yatube.slowlog`.
+Для SELECT на SQLite дополнительно снимается EXPLAIN QUERY PLAN:
+полный просмотр таблиц из SLOW_QUERY_WATCHED_TABLES помечается как
+`full_scans` и пишется в лог с уровнем WARNING.
+"""
+import logging
+import re
+import time
+from collections import deque
+
+from django.conf import settings
+from django.db import connection
+
+from .querytrace import template_position
+
+
+logger = logging.getLogger('yatube.slowlog')
+
+recent = deque(maxlen=settings.SLOW_QUERY_BUFFER)
+
+SCAN_RE = re.compile(r'^SCAN (?:TABLE )?(\w+)(.*)$')
+
+
+def explain(db, sql, params):
+    """Строки EXPLAIN QUERY PLAN; выполняется отдельным курсором,
+    чтобы не затронуть результат основного запроса.
+    """
+    cursor = db.create_cursor()
+    try:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+        return [row[-1] for row in cursor.fetchall()]
+    finally:
+        cursor.close()
+
+
+def full_scans(plan):
+    """Таблицы из SLOW_QUERY_WATCHED_TABLES, читаемые целиком."""
+    tables = []
+    for detail in plan:
+        match = SCAN_RE.match(detail)
+        if (match and match.group(1) in settings.SLOW_QUERY_WATCHED_TABLES
+                and 'USING' not in match.group(2)):
+            tables.append(match.group(1))
+    return tables
+
+
+class SlowQueryLogger:
+    """Обёртка для `connection.execute_wrapper` на время одного запроса."""
+
+    def __init__(self, request):
+        self.request = request
+
+    def view_name(self):
+        match = getattr(self.request, 'resolver_match', None)
+        return match.view_name if match else self.request.path
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.monotonic()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.monotonic() - start
+            if duration >= settings.SLOW_QUERY_THRESHOLD:
+                self.record(sql, params, many, duration, context['connection'])
+
+    def record(self, sql, params, many, duration, db):
+        plan = []
+        if (db.vendor == 'sqlite' and not many
+                and sql.lstrip().upper().startswith('SELECT')):
+            try:
+                plan = explain(db, sql, params)
+            except Exception:
+                logger.exception('Не удалось получить план запроса')
+        entry = {
+            'time': time.time(),
+            'duration_ms': duration * 1000,
+            'sql': sql,
+            'params': params,
+            'view': self.view_name(),
+            'template': template_position(),
+            'plan': plan,
+            'full_scans': full_scans(plan),
+        }
+        recent.append(entry)
+        logger.log(
+            logging.WARNING if entry['full_scans'] else logging.INFO,
+            '%s%.1f ms %s [%s] %s %r plan=%s',
+            'FULL SCAN %s: ' % ', '.join(entry['full_scans'])
+            if entry['full_scans'] else '',
+            duration * 1000,
+            entry['view'],
+            entry['template'] or '-',
+            sql,
+            params,
+            ' | '.join(plan),
+        )
+
+
+class SlowQueryMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with connection.execute_wrapper(SlowQueryLogger(request)):
+            return self.get_response(request)
@@ -0,0 +1,100 @@
+"""Защита от лавины пересчётов (cache stampede).
+
+`get_or_set` хранит значение вместе с поколением, временем устаревания
+и длительностью последнего пересчёта:
+
+- пересчёт начинается заранее, с вероятностью, растущей к моменту
+  устаревания (XFetch: чем дольше считается значение, тем раньше);
+- пересчитывает один процесс — тот, кто первым взял блокировку через
+  атомарный `cache.add`;
+- остальные в это время получают устаревшее значение, которое хранится
+  ещё STAMPEDE_STALE_TIMEOUT секунд после устаревания или до пересчёта
+  после смены поколения.
+
+Поколение не входит в ключ, поэтому после инвалидации тоже есть что
+отдать, пока строится новое значение. Отдачу устаревшего значения
+отмечает served_stale(): кеш страниц (yatube.pagecache) не сохраняет
+такие ответы.
+"""
+import math
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+_local = threading.local()
+
+
+def track_stale():
+    """Сбрасывает отметку served_stale() текущего потока."""
+    _local.stale = False
+
+
+def served_stale():
+    """Отдавал ли поток устаревшее значение после track_stale()."""
+    return getattr(_local, 'stale', False)
+
+
+def lock_key(key):
+    return f'{key}:rebuild'
+
+
+def is_fresh(entry, generation, now):
+    """Значение нужного поколения, и XFetch не выбрал его для пересчёта."""
+    _, entry_generation, expires, delta = entry
+    if entry_generation != generation:
+        return False
+    early = delta * settings.STAMPEDE_BETA * -math.log(1 - random.random())
+    return now + early < expires
+
+
+def rebuild(key, compute, timeout, generation):
+    start = time.time()
+    value = compute()
+    delta = time.time() - start
+    cache.set(
+        key,
+        (value, generation, time.time() + timeout, delta),
+        timeout + settings.STAMPEDE_STALE_TIMEOUT,
+    )
+    return value
+
+
+def wait_for(key, generation):
+    """Ждёт, пока значение построит владелец блокировки."""
+    # Локальный уровень TwoTierCache запоминает промахи, поэтому
+    # опрашиваем общий уровень напрямую.
+    shared = getattr(cache, 'shared', cache)
+    deadline = time.monotonic() + settings.STAMPEDE_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(settings.STAMPEDE_POLL_INTERVAL)
+        entry = shared.get(key)
+        if entry is not None and entry[1] == generation:
+            return entry
+    return None
+
+
+def get_or_set(key, compute, timeout, generation=None):
+    """Значение из кеша; `compute()` вызывается не более чем одним
+    процессом одновременно.
+    """
+    entry = cache.get(key)
+    if entry is not None and is_fresh(entry, generation, time.time()):
+        return entry[0]
+    lock = lock_key(key)
+    if cache.add(lock, True, settings.STAMPEDE_LOCK_TIMEOUT):
+        try:
+            return rebuild(key, compute, timeout, generation)
+        finally:
+            cache.delete(lock)
+    if entry is None:
+        entry = wait_for(key, generation)
+    elif entry[1] != generation or entry[2] < time.time():
+        _local.stale = True
+    if entry is not None:
+        return entry[0]
+    # Владелец блокировки не успел: считаем сами, но не сохраняем.
+    return compute()
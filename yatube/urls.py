@@ -15,18 +15,22 @@ Including another URLconf
 """
 from django.urls import include, path
 from django.contrib import admin
-from django.contrib.flatpages import views
 from django.conf import settings
 from django.conf.urls.static import static
 from django.conf.urls import handler404, handler500
+from . import flatpagecache, profiling
 
 
 handler404 = 'posts.views.page_not_found'  # noqa
 handler500 = 'posts.views.server_error'  # noqa
 
 urlpatterns = [
-    # flatpages
-    path('about/', include('django.contrib.flatpages.urls')),
+    # flatpages, из памяти процесса
+    path(
+        'about/<path:url>',
+        flatpagecache.flatpage,
+        name='django.contrib.flatpages.views.flatpage',
+    ),
     #  регистрация и авторизация
     path('auth/', include('users.urls')),
     #  если нужного шаблона для /auth не нашлось в файле users.urls —
@@ -34,13 +38,15 @@ urlpatterns = [
     path('auth/', include('django.contrib.auth.urls')),
     #  раздел администратора
     path('admin/', admin.site.urls),
+    #  профили медленных запросов, только для сотрудников
+    path('profiling/', profiling.dumps, name='profiling'),
 ]
 
 urlpatterns += [
-    path('about-us/', views.flatpage, {'url': '/about-us/'}, name='about'),
-    path('about-author/', views.flatpage, {'url': '/about-author/'}, name='author'),
-    path('about-spec/', views.flatpage, {'url': '/about-spec/'}, name='spec'),
-    path('terms/', views.flatpage, {'url': '/terms/'}, name='terms'),
+    path('about-us/', flatpagecache.flatpage, {'url': '/about-us/'}, name='about'),
+    path('about-author/', flatpagecache.flatpage, {'url': '/about-author/'}, name='author'),
+    path('about-spec/', flatpagecache.flatpage, {'url': '/about-spec/'}, name='spec'),
+    path('terms/', flatpagecache.flatpage, {'url': '/terms/'}, name='terms'),
 ]
 
 urlpatterns += [
@@ -0,0 +1,115 @@
+"""Прогрев процесса перед приёмом запросов.
+
+Компилирует шаблоны, строит таблицы URL-резолвера, импортирует
+sorl/PIL, загружает кеш сообществ и рендерит верхние страницы лент,
+заполняя кеш фрагментов и миниатюр. Используется командой
+`manage.py warmup` и модулем `yatube.launcher`.
+"""
+import os
+import time
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+from django.db.models import Max
+from django.template import TemplateSyntaxError, engines
+from django.test.client import RequestFactory
+from django.urls import get_resolver, reverse
+
+
+def template_names(engine):
+    """Имена всех шаблонов из каталогов, которые видят загрузчики движка."""
+    directories = []
+    for loader in engine.engine.template_loaders:
+        # cached.Loader оборачивает несколько настоящих загрузчиков.
+        for inner in getattr(loader, 'loaders', [loader]):
+            directories.extend(inner.get_dirs())
+    for directory in directories:
+        for root, _, files in os.walk(directory):
+            for name in files:
+                if name.endswith('.html'):
+                    path = os.path.join(root, name)
+                    yield os.path.relpath(path, directory)
+
+
+def compile_templates():
+    engine = engines['django']
+    compiled = errors = 0
+    for name in template_names(engine):
+        try:
+            engine.get_template(name)
+        except TemplateSyntaxError:
+            errors += 1
+        else:
+            compiled += 1
+    return f'{compiled} шаблонов, ошибок: {errors}'
+
+
+def resolve_routes():
+    resolver = get_resolver()
+    # reverse_dict заполняет таблицы резолвера для всех маршрутов.
+    names = [name for name in resolver.reverse_dict if isinstance(name, str)]
+    resolver.resolve('/')
+    return f'{len(names)} маршрутов'
+
+
+def import_thumbnails():
+    from PIL import Image  # noqa
+    from sorl.thumbnail import default
+
+    # Движок, хранилище и kvstore sorl создаются лениво при первом обращении.
+    for backend in ('backend', 'engine', 'kvstore', 'storage'):
+        getattr(default, backend)._setup()
+    return 'sorl.thumbnail, PIL'
+
+
+def load_groups():
+    from posts import groupcache
+
+    return f'{len(groupcache.by_id())} сообществ'
+
+
+def top_pages():
+    from posts.models import Group
+
+    pages = [
+        f'{reverse("index")}?page={number}'
+        for number in range(1, settings.WARMUP_INDEX_PAGES + 1)
+    ]
+    groups = Group.objects.annotate(
+        last_post=Max('posts__pub_date'),
+    ).filter(last_post__isnull=False).order_by('-last_post')
+    for slug in groups.values_list('slug', flat=True)[:settings.WARMUP_GROUPS]:
+        pages.append(reverse('group', args=[slug]))
+    return pages
+
+
+def render_pages():
+    """Анонимные запросы к верхним страницам лент через все middleware."""
+    handler = WSGIHandler()
+    factory = RequestFactory()
+    statuses = {}
+    for url in top_pages():
+        response = handler.get_response(factory.get(url))
+        response.close()
+        statuses[url] = response.status_code
+    failed = [url for url, status in statuses.items() if status != 200]
+    return f'{len(statuses)} страниц, с ошибкой: {", ".join(failed) or "нет"}'
+
+
+STEPS = (
+    ('templates', compile_templates),
+    ('urls', resolve_routes),
+    ('thumbnails', import_thumbnails),
+    ('groups', load_groups),
+    ('pages', render_pages),
+)
+
+
+def warm_up():
+    """Выполняет все шаги прогрева, возвращает [(шаг, секунды, итог)]."""
+    report = []
+    for name, step in STEPS:
+        start = time.monotonic()
+        result = step()
+        report.append((name, time.monotonic() - start, result))
+    return report